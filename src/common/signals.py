@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Category
+from infrastructure.comon.cache_versions import bump_version, data_version, reference_version
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    bump_version(reference_version(instance.user_id))
+    bump_version(data_version(instance.user_id))
@@ -24,7 +24,7 @@ class CategoryAsyncViewSet(ViewSet):
 
         categories = Category.objects.filter(user_id=user.id)
         category_list = [
-            CategoryRetriveDTO.model_validate(category).model_dump()
+            CategoryRetriveDTO.model_validate(category)
             async for category in categories
         ]
 
@@ -46,7 +46,7 @@ class CategoryAsyncViewSet(ViewSet):
                 user=user
             )
             return Response(
-                data=CategoryRetriveDTO.model_validate(category).model_dump(),
+                data=CategoryRetriveDTO.model_validate(category),
                 status=status.HTTP_201_CREATED
             )
         except Exception as e:
@@ -69,7 +69,7 @@ class CategoryAsyncViewSet(ViewSet):
             await category.asave()
             
             return Response(
-                data=CategoryRetriveDTO.model_validate(category).model_dump(),
+                data=CategoryRetriveDTO.model_validate(category),
                 status=status.HTTP_200_OK
             )
         except Category.DoesNotExist:
@@ -11,4 +11,8 @@ if [ "${RUN_COLLECTSTATIC:-1}" = "1" ]; then
   python manage.py collectstatic --noinput
 fi
 
+if [ "$#" -gt 0 ]; then
+  exec "$@"
+fi
+
 exec daphne -b 0.0.0.0 -p "${PORT:-8000}" effi_time.asgi:application
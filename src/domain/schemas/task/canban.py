@@ -1,18 +1,28 @@
 from pydantic import BaseModel, Field, field_validator
 
-from domain.schemas.task.main import TaskShortRetriveDTO
-
 
 class CanbanColumnRetriveDTO(BaseModel):
     id: int
     name: str
     color: str
-    tasks: list[TaskShortRetriveDTO] = Field(alias='task_set', default=[])
+    total: int = 0
+    next_cursor: str | None = None
+    # Task cards as dumped by task.fieldsets.TaskFieldset, with the BOARD_CARD fields asked for
+    tasks: list[dict] = Field(alias='task_set', default=[])
 
     @field_validator('tasks', mode='before')
     @staticmethod
-    def tasks_validator(value) -> list[TaskShortRetriveDTO]:
-        return value.all()
+    def tasks_validator(value) -> list:
+        if hasattr(value, 'all'):
+            return value.all()
+        return value
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+        populate_by_name = True
+
+
+class CanbanColumnPageRetriveDTO(BaseModel):
+    id: int
+    next_cursor: str | None = None
+    tasks: list[dict] = []
\ No newline at end of file
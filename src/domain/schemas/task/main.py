@@ -51,6 +51,9 @@ class TaskRetrieveDTO(BaseModel):
     subtasks: list[SubtaskRetrieveDTO] = []
     lifecycle: list[TaskLifecycleSegment] = []
     total_duration: str = ""
+    version: int = 0
+    # "queued" while the AI planner looks for a slot, "unscheduled" when it found none
+    planning: str = ""
 
     @field_validator("subtasks", "tags", mode="before")
     @staticmethod
@@ -72,22 +75,3 @@ class TaskStatusUpdateDTO(BaseModel):
 class TaskTimingUpdateDTO(BaseModel):
     started_at: datetime
     finished_at: datetime
-
-
-class TaskShortRetriveDTO(BaseModel):
-    id: int
-    name: str
-    description: str = ""
-    started_at: datetime | None = None
-    finished_at: datetime | None = None
-    deadline_at: datetime | None = None
-    tags: list[TagRetrieveDTO] = []
-    subtasks: list[SubtaskRetrieveDTO] = []
-
-    @field_validator("subtasks", "tags", mode="before")
-    @staticmethod
-    def validate_subtask_field(value) -> list:
-        return value.all()
-
-    class Config:
-        from_attributes = True
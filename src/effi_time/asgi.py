@@ -5,15 +5,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'effi_time.settings')
 django.setup()
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
+from infrastructure.comon.sessions import SessionAuthMiddlewareStack
 from presentation.websocket.urls import routes
 
 django_asgi_app = get_asgi_application()
 
 application = ProtocolTypeRouter({
     'http': django_asgi_app,
-    'websocket': AuthMiddlewareStack(
+    'websocket': SessionAuthMiddlewareStack(
         URLRouter(routes)
     )
 })
\ No newline at end of file
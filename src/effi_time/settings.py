@@ -1,3 +1,4 @@
+import copy
 import os
 import environ
 from pathlib import Path
@@ -50,6 +51,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'social_django.middleware.SocialAuthExceptionMiddleware',
+    'task.broadcasts.TaskBroadcastMiddleware',
+    'infrastructure.comon.db_routing.ReplicaPinningMiddleware',
 ]
 
 # Путиь к файлу, куда приходят сигналы для проверки пути
@@ -96,9 +99,48 @@ else:
             'PASSWORD': env.str('DB_PASSWORD', default='time_shape_manager'),
             'HOST': env.str('DB_HOST', default='db'),
             'PORT': env.str('DB_PORT', default='5432'),
+            'OPTIONS': {},
         }
     }
 
+    # Пул соединений psycopg 3: под ASGI у каждого запроса свой поток, CONN_MAX_AGE
+    # их не переиспользует. Размер — по числу потоков исполнителя (ASGI_THREADS).
+    DB_POOL = env.bool('DB_POOL', default=True)
+    if DB_POOL and DB_ENGINE.endswith('postgresql'):
+        from psycopg_pool import ConnectionPool
+
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DB_POOL_MAX_SIZE', default=env.int('ASGI_THREADS', default=20)),
+            'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+            'max_idle': env.float('DB_POOL_MAX_IDLE', default=600.0),
+            # Проверка соединения перед выдачей из пула
+            'check': ConnectionPool.check_connection,
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=0)
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Реплика для чтения аналитики, календаря и истории (см. infrastructure.comon.db_routing).
+# Без DB_REPLICA_HOST / DB_REPLICA_NAME всё читается из основной бд. Для проверки
+# локально хватит двух sqlite-файлов: DB_REPLICA_NAME=/path/to/replica.sqlite3
+DB_REPLICA_HOST = env.str('DB_REPLICA_HOST', default='')
+DB_REPLICA_NAME = env.str('DB_REPLICA_NAME', default='')
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': copy.deepcopy(DATABASES['default'].get('OPTIONS', {})),
+        'NAME': DB_REPLICA_NAME or DATABASES['default']['NAME'],
+        # В тестах реплика — та же бд, что и основная
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_REPLICA_HOST:
+        DATABASES['replica']['HOST'] = DB_REPLICA_HOST
+        DATABASES['replica']['PORT'] = env.str('DB_REPLICA_PORT', default=DATABASES['default'].get('PORT', ''))
+# Сколько секунд после записи клиент читает из основной бд, пока реплика догоняет
+DB_REPLICA_PIN_SECONDS = env.int('DB_REPLICA_PIN_SECONDS', default=15)
+DATABASE_ROUTERS = ['infrastructure.comon.db_routing.ReplicaRouter']
+
 
 SOCIAL_AUTH_VK_OAUTH2_API_VERSION = '5.131'
 SOCIAL_AUTH_REDIRECT_IS_HTTPS = True
@@ -155,11 +197,54 @@ MEDIA_ROOT = str(BASE_DIR / 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'infrastructure.comon.renderers.ORJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'infrastructure.comon.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+REDIS_HOST = env.str('REDIS_HOST', default='127.0.0.1')
+REDIS_PORT = env.int('REDIS_PORT', default=6379)
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [(env.str('REDIS_HOST', default='127.0.0.1'), env.int('REDIS_PORT', default=6379))],
+            "hosts": [(REDIS_HOST, REDIS_PORT)],
         },
     },
 }
+
+# Сессии: "cached" — Redis с записью в БД, "db" — только БД
+SESSION_MODE = env.str('SESSION_MODE', default='cached')
+if SESSION_MODE == 'cached':
+    SESSION_ENGINE = 'infrastructure.comon.sessions'
+SESSION_REDIS_URL = env.str('SESSION_REDIS_URL', default=f'redis://{REDIS_HOST}:{REDIS_PORT}/1')
+
+# Кэш: "redis" — общий для всех процессов, "locmem" — в памяти процесса
+CACHE_MODE = env.str('CACHE_MODE', default='redis')
+if CACHE_MODE == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env.str('CACHE_REDIS_URL', default=f'redis://{REDIS_HOST}:{REDIS_PORT}/2'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Версии данных в кэше (infrastructure.comon.cache_versions) должны быть общими для
+# всех процессов: app, relay и planner двигают их каждый у себя. С locmem у каждого
+# процесса свои версии, поэтому кэширование по версиям и ETag тогда отключены.
+# Несколько процессов — только с CACHE_MODE=redis. Для locmem включать, лишь если
+# всё работает в одном процессе (например, в тестах).
+CACHE_VERSIONS_SHARED = env.bool('CACHE_VERSIONS_SHARED', default=CACHE_MODE == 'redis')
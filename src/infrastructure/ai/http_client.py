@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import ssl
+import weakref
+
+import aiohttp
+
+
+POOL_SIZE = 20
+KEEPALIVE_TIMEOUT = 60
+CONNECT_TIMEOUT = 10
+
+
+@functools.lru_cache(maxsize=None)
+def _ssl_context(verify: bool, ca_bundle: str | None) -> ssl.SSLContext | bool:
+    if not verify:
+        return False
+
+    ctx = ssl.create_default_context()
+    if ca_bundle:
+        ctx.load_verify_locations(cafile=ca_bundle)
+    else:
+        try:
+            import certifi  # type: ignore
+
+            ctx.load_verify_locations(cafile=certifi.where())
+        except Exception:
+            pass
+    return ctx
+
+
+def ssl_settings() -> tuple[bool, str | None]:
+    ssl_verify_raw = (os.getenv("OPENROUTER_SSL_VERIFY", "1") or "1").strip().lower()
+    return ssl_verify_raw not in {"0", "false", "no", "off"}, os.getenv("OPENROUTER_CA_BUNDLE") or None
+
+
+class PooledHTTPClient:
+    """
+    Keep-alive aiohttp sessions shared by every AI call. aiohttp sessions are
+    bound to an event loop, so one session (and connection pool) is kept per
+    running loop.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, keepalive_timeout: int = KEEPALIVE_TIMEOUT):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession] = weakref.WeakKeyDictionary()
+
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=_ssl_context(*ssl_settings()),
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    async def post_json(self, url: str, payload: dict, *, headers: dict, timeout: float) -> tuple[int, str]:
+        client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=CONNECT_TIMEOUT)
+        async with self.session().post(url, json=payload, headers=headers, timeout=client_timeout) as response:
+            return response.status, await response.text(errors="replace")
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+
+http_client = PooledHTTPClient()
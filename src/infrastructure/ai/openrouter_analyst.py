@@ -2,8 +2,6 @@ from __future__ import annotations
 
 import json
 import logging
-import os
-import urllib.error
 from pydantic import BaseModel, Field, ValidationError
 from .openrouter_planner import call_openrouter, _extract_first_json_object, MAX_RETRIES
 
@@ -47,7 +45,7 @@ class AnalysisResult(BaseModel):
     analysis: str
     recommendations: list[str]
 
-def analyze_productivity(data: AnalysisInput) -> AnalysisResult:
+async def analyze_productivity(data: AnalysisInput) -> AnalysisResult:
     user_prompt = f"""
 Проанализируй следующую статистику за неделю:
 
@@ -64,7 +62,7 @@ def analyze_productivity(data: AnalysisInput) -> AnalysisResult:
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            raw_content, _ = call_openrouter(SYSTEM_PROMPT, user_prompt, attempt=attempt)
+            raw_content, _ = await call_openrouter(SYSTEM_PROMPT, user_prompt, attempt=attempt)
             
             parsed_json = None
             try:
@@ -0,0 +1,83 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+
+def content_key(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SingleFlightCache:
+    """
+    Process-local LRU cache with TTL for results of expensive coroutines.
+
+    Concurrent calls with the same key on one event loop share a single
+    in-flight call, so only one upstream request is made. Cancelling a caller
+    does not cancel the shared call. Exceptions are not cached.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark as retrieved so a failure without waiters is not logged.
+            task.exception()
+
+    async def _call(self, key: str, factory: Callable[[], Awaitable[Any]]):
+        value = await factory()
+        self.set(key, value)
+        return value
+
+    async def get_or_call(self, key: str, factory: Callable[[], Awaitable[Any]]):
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is None or pending.get_loop() is not loop:
+            # A task of its own: a cancelled caller, the first one included,
+            # leaves the call running for the others.
+            pending = loop.create_task(self._call(key, factory))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda task: self._forget(key, task))
+        return await asyncio.shield(pending)
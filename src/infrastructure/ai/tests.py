@@ -0,0 +1,67 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from infrastructure.ai.response_cache import SingleFlightCache
+
+
+class SingleFlightCacheTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_call(self):
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def run():
+            cache = SingleFlightCache()
+            results = await asyncio.gather(*(cache.get_or_call("key", factory) for _ in range(3)))
+            return results, await cache.get_or_call("key", factory)
+
+        results, cached = asyncio.run(run())
+
+        self.assertEqual(results, ["value"] * 3)
+        self.assertEqual(cached, "value")
+        self.assertEqual(len(calls), 1)
+
+    def test_cancelled_first_caller_leaves_call_to_waiters(self):
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def run():
+            cache = SingleFlightCache()
+            leader = asyncio.create_task(cache.get_or_call("key", factory))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(cache.get_or_call("key", factory))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await waiter, leader
+
+        value, leader = asyncio.run(run())
+
+        self.assertEqual(value, "value")
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(len(calls), 1)
+
+    def test_exceptions_are_not_cached(self):
+        attempts = []
+
+        async def factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("upstream")
+            return "value"
+
+        async def run():
+            cache = SingleFlightCache()
+            with self.assertRaises(RuntimeError):
+                await cache.get_or_call("key", factory)
+            return await cache.get_or_call("key", factory)
+
+        self.assertEqual(asyncio.run(run()), "value")
+        self.assertEqual(len(attempts), 2)
@@ -1,21 +1,114 @@
+import copy
+import threading
+import time
+
 from adrf.requests import AsyncRequest
-from asgiref.sync import sync_to_async
+from django.utils.functional import empty
 from rest_framework.authentication import BaseAuthentication
 
+from infrastructure.comon.cache_versions import aget_versions, auth_version
+from infrastructure.comon.sessions import aget_user
 from user.models import User
 
 
+SESSION_USER_TTL_SECONDS = 30
+MAX_CACHED_SESSIONS = 4096
+
+
+class SessionUserCache:
+    """
+    Process-local { session_key: user } cache with a short TTL. Entries carry
+    the user's auth version (cache_versions.auth_version), which is bumped
+    when the user is saved or logs out (see user.signals), so no process
+    serves a user cached before a profile or password change. A hit is only
+    served while its session still exists. Without a shared version store
+    nothing is cached.
+    """
+
+    def __init__(self, ttl_seconds: float = SESSION_USER_TTL_SECONDS, max_entries: int = MAX_CACHED_SESSIONS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[float, int, User]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, session_key: str) -> tuple[float, int, User] | None:
+        with self._lock:
+            entry = self._entries.get(session_key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[session_key]
+                return None
+            return entry
+
+    async def aget(self, session) -> User | None:
+        session_key = session.session_key
+        if not session_key:
+            return None
+        entry = self._entry(session_key)
+        if entry is None:
+            return None
+
+        _expires_at, version, user = entry
+        versions = await aget_versions(auth_version(user.pk))
+        if versions is None or versions[0] != version or not await session.aexists(session_key):
+            self.invalidate_session(session_key)
+            return None
+        # Views mutate request.user, never hand out the cached instance itself.
+        return copy.copy(user)
+
+    async def aset(self, session_key: str | None, user: User) -> None:
+        if not session_key or not user.is_authenticated:
+            return
+        versions = await aget_versions(auth_version(user.pk))
+        if versions is None:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[0] >= now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[session_key] = (time.monotonic() + self.ttl_seconds, versions[0], copy.copy(user))
+
+    def invalidate_session(self, session_key: str | None) -> None:
+        with self._lock:
+            self._entries.pop(session_key, None)
+
+
+session_user_cache = SessionUserCache()
+
+
+def _middleware_user(request):
+    """
+    The user AuthenticationMiddleware has already resolved for this request,
+    without triggering a lookup of its own.
+    """
+    user = getattr(request, "_acached_user", None)
+    if user is not None:
+        return user
+    lazy_user = request.__dict__.get("user")
+    wrapped = getattr(lazy_user, "_wrapped", empty)
+    return None if wrapped is empty else wrapped
+
+
 class AsyncAuthentication(BaseAuthentication):
     async def authenticate(self, request: AsyncRequest):
-        user_id = await sync_to_async(lambda: request.session.get('_auth_user_id'))()
+        django_request = request._request
+        session_key = django_request.session.session_key
 
         try:
-            user = await User.objects.aget(pk=user_id)
+            user = _middleware_user(django_request)
+            if user is None:
+                user = await session_user_cache.aget(django_request.session)
+                if user is not None:
+                    return user, None
+                # Loads the session and verifies its password hash, like the middleware would
+                user = await aget_user(django_request.session)
 
-            return user, None
+            if not user.is_authenticated:
+                return None
 
-        except User.DoesNotExist:
-            return None
+            await session_user_cache.aset(session_key, user)
+            return user, None
 
         except Exception:
-            return None
\ No newline at end of file
+            return None
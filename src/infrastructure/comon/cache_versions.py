@@ -0,0 +1,109 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from redis import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "version:"
+
+# Version of the global status table
+STATUS_VERSION = "statuses"
+
+
+def reference_version(user_id: int) -> str:
+    """
+    Version of a user's tags and categories.
+    """
+    return f"reference:{user_id}"
+
+
+def data_version(user_id: int) -> str:
+    """
+    Version of everything a user sees: tasks, subtasks, tags, categories,
+    comments and the profile.
+    """
+    return f"data:{user_id}"
+
+
+def auth_version(user_id: int) -> str:
+    """
+    Version of what authenticates a user: the profile, the password and
+    is_active, and the user's sessions.
+    """
+    return f"auth:{user_id}"
+
+
+def _incr(name: str) -> None:
+    try:
+        cache.incr(KEY_PREFIX + name)
+    except ValueError:
+        # Never read yet, the first read starts it at a fresh value
+        pass
+    except RedisError:
+        logger.warning("Cache versions: bump of %s failed", name, exc_info=True)
+
+
+def bump_version(name: str) -> None:
+    """
+    Move name to a new version once the current transaction commits, so
+    nothing cached under the old one is read again.
+    """
+    transaction.on_commit(lambda: _incr(name))
+
+
+def versions_shared() -> bool:
+    """
+    Whether all processes read the same versions (settings.CACHE_VERSIONS_SHARED).
+    A version kept in one process's memory does not move when another
+    process changes the data, so nothing may be cached or validated under it.
+    """
+    return settings.CACHE_VERSIONS_SHARED
+
+
+def get_versions(*names: str) -> tuple[int, ...] | None:
+    """
+    Synchronous aget_versions.
+    """
+    if not versions_shared():
+        return None
+    keys = [KEY_PREFIX + name for name in names]
+    try:
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                cache.add(key, time.time_ns(), timeout=None)
+                found[key] = cache.get(key)
+    except RedisError:
+        logger.warning("Cache versions: read failed", exc_info=True)
+        return None
+    if any(found[key] is None for key in keys):
+        return None
+    return tuple(found[key] for key in keys)
+
+
+async def aget_versions(*names: str) -> tuple[int, ...] | None:
+    """
+    Current versions of names, or None when the cache is unavailable or not
+    shared between processes and the caller has to go to the database.
+    """
+    if not versions_shared():
+        return None
+    keys = [KEY_PREFIX + name for name in names]
+    try:
+        found = await cache.aget_many(keys)
+        for key in keys:
+            if key not in found:
+                # Nanoseconds never repeat a version that was evicted or lost with Redis
+                await cache.aadd(key, time.time_ns(), timeout=None)
+                found[key] = await cache.aget(key)
+    except RedisError:
+        logger.warning("Cache versions: read failed", exc_info=True)
+        return None
+    if any(found[key] is None for key in keys):
+        return None
+    return tuple(found[key] for key in keys)
@@ -0,0 +1,62 @@
+import functools
+
+from django.utils.cache import get_conditional_response
+
+from infrastructure.comon.cache_versions import versions_shared
+from infrastructure.comon.db_routing import reading_from_replica
+
+
+def version_etag(*parts, weak: bool = False) -> str:
+    """
+    ETag made of the versions (and anything else) a response depends on.
+    Strong unless weak is set, for bodies that are only equivalent, not
+    byte-identical, while the parts stay the same.
+    """
+    etag = '"%s"' % "-".join(str(part) for part in parts)
+    return "W/" + etag if weak else etag
+
+
+def _with_validators(response, etag: str):
+    response["ETag"] = etag
+    # Always revalidated, a 304 costs no queries
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional(etag_func):
+    """
+    Answer a request whose If-None-Match holds the current ETag with 304
+    before the view runs any query. etag_func(view, request, *args, **kwargs)
+    is a coroutine function returning the ETag, or None when it cannot be
+    computed and the view should just run. Nothing is validated while the
+    versions are not shared between processes (see versions_shared).
+
+        @login_required
+        @conditional(_board_etag)
+        async def get_canaban_table(self, request):
+            ...
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        async def wrapper(cls, request, *args, **kwargs):
+            # Another process may have moved on without this one's ETag changing
+            if not versions_shared():
+                return await view_func(cls, request, *args, **kwargs)
+
+            etag = await etag_func(cls, request, *args, **kwargs)
+            if etag is None:
+                return await view_func(cls, request, *args, **kwargs)
+
+            not_modified = get_conditional_response(request._request, etag=etag)
+            if not_modified is not None:
+                return _with_validators(not_modified, etag)
+
+            response = await view_func(cls, request, *args, **kwargs)
+            # A lagging replica may not have the data the version stands for yet
+            if response.status_code == 200 and not reading_from_replica():
+                _with_validators(response, etag)
+            return response
+
+        return wrapper
+
+    return decorator
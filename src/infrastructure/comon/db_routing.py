@@ -0,0 +1,111 @@
+import functools
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "db_pin"
+
+# Alias reads go to in this request, None for the router's default (primary)
+_read_alias: ContextVar[str | None] = ContextVar("db_read_alias", default=None)
+# { "written": bool } for the request being handled
+_request_writes: ContextVar[dict | None] = ContextVar("db_request_writes", default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def reading_from_replica() -> bool:
+    return _read_alias.get() is not None
+
+
+def _pinned(request) -> bool:
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRouter:
+    """
+    Sends reads of views marked with replica_reads to the replica and
+    everything else to the primary. Writes mark the request, so the client
+    keeps reading from the primary until the replica has caught up (see
+    ReplicaPinningMiddleware).
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes["written"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
+
+
+def replica_reads(view_func):
+    """
+    Read from the replica for the rest of the request, unless the client
+    wrote within the last DB_REPLICA_PIN_SECONDS or no replica is configured.
+
+    The alias is not reset when the view returns: streamed bodies run their
+    queries after that. Every request is handled in a task of its own, so it
+    does not leak into other requests.
+    """
+    @functools.wraps(view_func)
+    async def wrapper(cls, *args, **kwargs):
+        if replica_configured() and not _pinned(cls.request):
+            _read_alias.set(REPLICA_ALIAS)
+        return await view_func(cls, *args, **kwargs)
+
+    return wrapper
+
+
+def _pin(response, writes: dict):
+    if writes["written"] and replica_configured():
+        pin_seconds = settings.DB_REPLICA_PIN_SECONDS
+        response.set_cookie(
+            PIN_COOKIE, str(int(time.time() + pin_seconds)),
+            max_age=pin_seconds, httponly=True, samesite="Lax",
+        )
+    return response
+
+
+@sync_and_async_middleware
+def ReplicaPinningMiddleware(get_response):
+    """
+    Sets the pin cookie on responses to requests that wrote to the database.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            writes = {"written": False}
+            token = _request_writes.set(writes)
+            try:
+                response = await get_response(request)
+            finally:
+                _request_writes.reset(token)
+            return _pin(response, writes)
+    else:
+        def middleware(request):
+            writes = {"written": False}
+            token = _request_writes.set(writes)
+            try:
+                response = get_response(request)
+            finally:
+                _request_writes.reset(token)
+            return _pin(response, writes)
+
+    return middleware
@@ -0,0 +1,49 @@
+import datetime
+import decimal
+
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from pydantic import BaseModel
+from rest_framework.renderers import BaseRenderer
+
+
+def _default(obj):
+    """
+    Types orjson does not serialise itself. Pydantic DTOs are serialised by
+    pydantic and embedded as they are, so views can return DTOs instead of
+    model_dump() output.
+    """
+    if isinstance(obj, BaseModel):
+        return orjson.Fragment(obj.model_dump_json())
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (QuerySet, set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(data) -> bytes:
+    return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop-in for rest_framework.renderers.JSONRenderer on top of orjson. UTC
+    datetimes end in "Z" like DRF renders them.
+    """
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return dumps(data)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import weakref
+
+from asgiref.sync import sync_to_async
+from channels.auth import AuthMiddleware
+from channels.sessions import CookieMiddleware, SessionMiddleware
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model, load_backend
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends import db
+from django.utils.crypto import constant_time_compare
+from redis import Redis, RedisError
+from redis.asyncio import Redis as AsyncRedis
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "session:"
+
+
+@functools.lru_cache(maxsize=None)
+def _sync_client() -> Redis:
+    return Redis.from_url(settings.SESSION_REDIS_URL)
+
+
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _async_client() -> AsyncRedis:
+    # redis.asyncio connections are bound to the loop they were opened on
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncRedis.from_url(settings.SESSION_REDIS_URL)
+    return client
+
+
+class SessionStore(db.SessionStore):
+    """
+    Database sessions with a Redis copy of the encoded session data. Reads go
+    to Redis first and fall back to django_session, writes go to both. The
+    async read path (aload, and Django's aget & co. on top of it) does not
+    leave the event loop on a Redis hit.
+    """
+
+    @staticmethod
+    def _redis_key(session_key: str) -> str:
+        return KEY_PREFIX + session_key
+
+    def _decode_cached(self, raw: bytes | None) -> dict | None:
+        return None if raw is None else self.decode(raw.decode())
+
+    def _cache_set(self, session_data: str, expiry_age: int):
+        if expiry_age <= 0:
+            return
+        try:
+            _sync_client().set(self._redis_key(self.session_key), session_data, ex=expiry_age)
+        except RedisError:
+            logger.warning("Session cache: write failed", exc_info=True)
+
+    def _load_from_db(self) -> dict:
+        s = self._get_session_from_db()
+        if s is None:
+            return {}
+        self._cache_set(s.session_data, self.get_expiry_age(expiry=s.expire_date))
+        return self.decode(s.session_data)
+
+    def load(self):
+        try:
+            cached = self._decode_cached(_sync_client().get(self._redis_key(self.session_key)))
+        except RedisError:
+            logger.warning("Session cache: read failed", exc_info=True)
+            cached = None
+        return self._load_from_db() if cached is None else cached
+
+    async def aload(self):
+        try:
+            cached = self._decode_cached(await _async_client().get(self._redis_key(self.session_key)))
+        except RedisError:
+            logger.warning("Session cache: read failed", exc_info=True)
+            cached = None
+        if cached is None:
+            cached = await sync_to_async(self._load_from_db)()
+        return cached
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        super().save(must_create=must_create)
+        self._cache_set(self.encode(self._get_session(no_load=must_create)), self.get_expiry_age())
+
+    async def aexists(self, session_key):
+        try:
+            if await _async_client().exists(self._redis_key(session_key)):
+                return True
+        except RedisError:
+            logger.warning("Session cache: read failed", exc_info=True)
+        return await super().aexists(session_key)
+
+    async def asave(self, must_create=False):
+        await sync_to_async(self.save)(must_create=must_create)
+
+    async def adelete(self, session_key=None):
+        await sync_to_async(self.delete)(session_key)
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        super().delete(session_key)
+        if session_key is None:
+            return
+        try:
+            _sync_client().delete(self._redis_key(session_key))
+        except RedisError:
+            logger.warning("Session cache: delete failed", exc_info=True)
+
+
+async def aget_user(session):
+    """
+    django.contrib.auth.get_user for a session instead of a request, reading
+    the session through the engine's aload.
+    """
+    await session._aget_session()
+
+    try:
+        user_id = get_user_model()._meta.pk.to_python(session[SESSION_KEY])
+        backend_path = session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    backend = load_backend(backend_path)
+    user = await get_user_model()._default_manager.filter(pk=user_id).afirst()
+    if user is None:
+        return AnonymousUser()
+    if hasattr(backend, "user_can_authenticate") and not backend.user_can_authenticate(user):
+        return AnonymousUser()
+
+    if hasattr(user, "get_session_auth_hash"):
+        session_hash = session.get(HASH_SESSION_KEY)
+        session_auth_hash = user.get_session_auth_hash()
+        if not session_hash or not constant_time_compare(session_hash, session_auth_hash):
+            if session_hash and any(
+                constant_time_compare(session_hash, fallback_auth_hash)
+                for fallback_auth_hash in user.get_session_auth_fallback_hash()
+            ):
+                await sync_to_async(session.cycle_key)()
+                session[HASH_SESSION_KEY] = session_auth_hash
+            else:
+                await sync_to_async(session.flush)()
+                return AnonymousUser()
+
+    return user
+
+
+class SessionAuthMiddleware(AuthMiddleware):
+    """
+    channels' AuthMiddleware resolving scope["user"] through aget_user.
+    """
+
+    async def resolve_scope(self, scope):
+        scope["user"]._wrapped = await aget_user(scope["session"])
+
+
+def SessionAuthMiddlewareStack(inner):
+    return CookieMiddleware(SessionMiddleware(SessionAuthMiddleware(inner)))
@@ -0,0 +1,86 @@
+import logging
+
+from typing import AsyncIterable, AsyncIterator
+
+from django.http import StreamingHttpResponse
+
+from infrastructure.comon.renderers import dumps
+
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 200
+
+
+async def _chain(head: list, rest: AsyncIterator | None) -> AsyncIterator:
+    for item in head:
+        yield item
+    if rest is not None:
+        async for item in rest:
+            yield item
+
+
+async def prefetched(items: AsyncIterable, count: int = STREAM_CHUNK_SIZE) -> AsyncIterator:
+    """
+    Read the first count items now and return an iterator over all of them.
+    The query runs, and fails, while the view can still answer with an error
+    status instead of a response that is already on its way.
+    """
+    iterator = aiter(items)
+    head = []
+    try:
+        while len(head) < count:
+            head.append(await anext(iterator))
+    except StopAsyncIteration:
+        return _chain(head, None)
+    return _chain(head, iterator)
+
+
+async def json_array(items: AsyncIterable, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Encode items as a JSON array, one piece per chunk_size items, so only a
+    chunk of the response is held in memory at a time.
+    """
+    yield b"["
+    separator = b""
+    buffer = []
+    async for item in items:
+        buffer.append(dumps(item))
+        if len(buffer) >= chunk_size:
+            yield separator + b",".join(buffer)
+            separator = b","
+            buffer = []
+    if buffer:
+        yield separator + b",".join(buffer)
+    yield b"]"
+
+
+async def json_object(head: dict, key: str, items: AsyncIterable, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Encode head with one more key whose value is the streamed array of items.
+    """
+    encoded = dumps(head)
+    yield encoded[:-1] + (b"," if head else b"") + dumps(key) + b":"
+    async for part in json_array(items, chunk_size):
+        yield part
+    yield b"}"
+
+
+async def _logged(streaming_content: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    try:
+        async for part in streaming_content:
+            yield part
+    except Exception:
+        # Status and headers are gone already, aborting is all that is left
+        logger.exception("Streamed JSON response failed midway")
+        raise
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    A failure while streaming aborts the response, the client gets a cut off
+    body rather than a complete-looking one.
+    """
+
+    def __init__(self, streaming_content: AsyncIterable[bytes], status: int = 200):
+        super().__init__(_logged(streaming_content), content_type="application/json", status=status)
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from infrastructure.comon.authetication import SessionUserCache
+from infrastructure.comon.conditional import conditional, version_etag
+from infrastructure.comon.db_routing import PIN_COOKIE, REPLICA_ALIAS
+from infrastructure.comon.streaming import StreamingJSONResponse, json_array, prefetched
+from task.models import Status, Tag, Task, TaskHistory
+from user.models import User
+
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CACHE_VERSIONS_SHARED=True)
+class SessionUserCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.session = SessionStore()
+        self.session.create()
+        self.cache = SessionUserCache()
+        async_to_sync(self.cache.aset)(self.session.session_key, self.user)
+
+    def cached_user(self):
+        return async_to_sync(self.cache.aget)(self.session)
+
+    def test_hit_is_a_copy(self):
+        user = self.cached_user()
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsNot(user, self.cached_user())
+
+    def test_saved_user_is_not_served(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Новое имя"
+            self.user.save()
+
+        self.assertIsNone(self.cached_user())
+
+    def test_deleted_session_is_not_served(self):
+        self.session.delete()
+
+        self.assertIsNone(self.cached_user())
+
+    @override_settings(CACHE_VERSIONS_SHARED=False)
+    def test_nothing_cached_without_shared_versions(self):
+        cache = SessionUserCache()
+        async_to_sync(cache.aset)(self.session.session_key, self.user)
+
+        self.assertIsNone(async_to_sync(cache.aget)(self.session))
+
+
+async def _numbers(count: int, fail_at: int | None = None):
+    for number in range(count):
+        if number == fail_at:
+            raise RuntimeError("query failed")
+        yield number
+
+
+async def _collect(items) -> list:
+    return [item async for item in items]
+
+
+async def _prefetch_and_collect(items, count: int) -> list:
+    return await _collect(await prefetched(items, count=count))
+
+
+class StreamingTests(SimpleTestCase):
+    def test_prefetched_keeps_every_item(self):
+        for count in (0, 2, 5):
+            with self.subTest(count=count):
+                items = asyncio.run(_prefetch_and_collect(_numbers(count), count=2))
+                self.assertEqual(items, list(range(count)))
+
+    def test_prefetched_raises_early_failures(self):
+        with self.assertRaises(RuntimeError):
+            asyncio.run(prefetched(_numbers(5, fail_at=1), count=2))
+
+    def test_failure_midway_aborts_response(self):
+        response = StreamingJSONResponse(json_array(_numbers(5, fail_at=3), chunk_size=1))
+
+        with self.assertLogs("infrastructure.comon.streaming", level="ERROR"), self.assertRaises(RuntimeError):
+            asyncio.run(_collect(response.streaming_content))
+
+
+class _Request:
+    def __init__(self, django_request):
+        self._request = django_request
+
+
+async def _fixed_etag(view, request):
+    return '"1"'
+
+
+async def _weak_etag(view, request):
+    return version_etag(1, weak=True)
+
+
+class _View:
+    calls = 0
+
+    @conditional(_fixed_etag)
+    async def get(self, request):
+        self.calls += 1
+        return HttpResponse("body")
+
+
+class _WeakView(_View):
+    @conditional(_weak_etag)
+    async def get(self, request):
+        self.calls += 1
+        return HttpResponse("body")
+
+
+class ConditionalTests(SimpleTestCase):
+    def get(self, view_class=_View, **headers):
+        view = view_class()
+        response = asyncio.run(view.get(_Request(RequestFactory().get("/", headers=headers))))
+        return view, response
+
+    @override_settings(CACHE_VERSIONS_SHARED=True)
+    def test_current_etag_is_not_modified(self):
+        view, response = self.get(if_none_match='"1"')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(view.calls, 0)
+
+    @override_settings(CACHE_VERSIONS_SHARED=True)
+    def test_response_carries_etag(self):
+        _, response = self.get(if_none_match='"0"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"1"')
+
+    @override_settings(CACHE_VERSIONS_SHARED=False)
+    def test_no_etag_without_shared_versions(self):
+        view, response = self.get(if_none_match='"1"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(view.calls, 1)
+        self.assertFalse(response.has_header("ETag"))
+
+    @override_settings(CACHE_VERSIONS_SHARED=True)
+    def test_weak_etag(self):
+        _, response = self.get(_WeakView)
+        self.assertEqual(response["ETag"], 'W/"1"')
+
+        view, response = self.get(_WeakView, if_none_match='W/"1"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(view.calls, 0)
+
+
+async def _fetch(client, method: str, path: str, **kwargs):
+    response = await getattr(client, method)(path, **kwargs)
+    # Streamed bodies run their queries after the view returns
+    body = b"".join([part async for part in response]) if response.streaming else response.content
+    return response, body
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CACHE_VERSIONS_SHARED=True)
+class ReplicaRoutingTests(TestCase):
+    """
+    The replica is a second SQLite database holding a different history row
+    for the same task, so the response shows which database was read.
+    """
+
+    # Read again in setUpClass, once the replica alias exists
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        default = settings.DATABASES["default"]
+        # connections reads its aliases from settings.DATABASES
+        settings.DATABASES[REPLICA_ALIAS] = {
+            **default,
+            "NAME": str(Path(cls.replica_dir) / "replica.sqlite3"),
+            "TEST": {**default["TEST"], "MIRROR": None},
+        }
+        with connections[REPLICA_ALIAS].schema_editor() as editor:
+            for model in apps.get_models():
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del settings.DATABASES[REPLICA_ALIAS]
+        shutil.rmtree(cls.replica_dir)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="owner", password="secret")
+        cls.status = Status.objects.create(name="Новая", type="new", color="#aaa")
+        [cls.task] = Task.objects.bulk_create([Task(user=cls.user, name="Задача", status=cls.status)])
+        TaskHistory.objects.bulk_create([TaskHistory(task=cls.task, user=cls.user, field="Основная")])
+
+        User.objects.using(REPLICA_ALIAS).bulk_create([User(id=cls.user.id, username="owner")])
+        Task.objects.using(REPLICA_ALIAS).bulk_create([Task(id=cls.task.id, user_id=cls.user.id, name="Задача")])
+        TaskHistory.objects.using(REPLICA_ALIAS).bulk_create([
+            TaskHistory(task_id=cls.task.id, user_id=cls.user.id, field="Реплика"),
+        ])
+
+    def setUp(self):
+        self.async_client.force_login(self.user)
+
+    async def request(self, method: str, path: str, **kwargs):
+        # A task per request, as Daphne runs them, so the read alias stays with its request
+        return await asyncio.create_task(_fetch(self.async_client, method, path, **kwargs))
+
+    async def history(self) -> list[str]:
+        response, body = await self.request("get", f"/task/{self.task.id}/history/")
+        self.assertEqual(response.status_code, 200)
+        return [item["field"] for item in json.loads(body)]
+
+    async def test_marked_reads_go_to_replica(self):
+        self.assertEqual(await self.history(), ["Реплика"])
+
+    async def test_pinned_reads_go_to_primary(self):
+        self.async_client.cookies[PIN_COOKIE] = str(int(time.time()) + 60)
+
+        self.assertEqual(await self.history(), ["Основная"])
+
+    async def test_write_goes_to_primary_and_pins(self):
+        response, _ = await self.request("post", "/task/tags/", data={"name": "Тэг"}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Tag.objects.using("default").filter(name="Тэг").aexists())
+        self.assertFalse(await Tag.objects.using(REPLICA_ALIAS).filter(name="Тэг").aexists())
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(await self.history(), ["Основная"])
+
+    async def test_no_etag_for_replica_reads(self):
+        response, _ = await self.request("get", "/task/calendar/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+
+        self.async_client.cookies[PIN_COOKIE] = str(int(time.time()) + 60)
+        response, _ = await self.request("get", "/task/calendar/")
+        self.assertTrue(response.has_header("ETag"))
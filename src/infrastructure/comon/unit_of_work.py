@@ -0,0 +1,45 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+
+def unit_of_work(func=None, *, atomic: bool = True, using: str | None = None):
+    """
+    Turn a block of synchronous ORM code into a coroutine function that runs
+    it in a single sync_to_async hop, inside one transaction unless
+    atomic=False. Every aget / async for / asave pays an executor round trip
+    of its own, a unit of work pays one for all of them.
+
+    The block should return plain results (model instances with what the
+    caller needs already loaded, dicts, DTOs), not lazy querysets.
+
+        @unit_of_work
+        def _move_task(self, task_id, ...):
+            ...
+
+        result = await self._move_task(task_id, ...)
+    """
+    def decorator(block):
+        run = transaction.atomic(using=using)(block) if atomic else block
+        hop = sync_to_async(run)
+
+        @functools.wraps(block)
+        async def wrapper(*args, **kwargs):
+            return await hop(*args, **kwargs)
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+class Rejected(Exception):
+    """
+    Raised from a unit of work to roll it back and answer 400 with detail.
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
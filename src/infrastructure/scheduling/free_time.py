@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from infrastructure.comon.cache_versions import data_version, get_versions
+from task.models import Task
+
+
+MIN_FREE_SLOT_MINUTES = 15
+MAX_CACHED_USERS = 1024
+
+
+class BusyTimeline:
+    """
+    Merged busy intervals of one user, stored as two parallel sorted arrays
+    of epoch seconds. version is the user's data version the intervals were
+    loaded at; a timeline is never changed after that.
+    """
+
+    def __init__(self, intervals: dict[int, tuple[float, float]], version: int | None = None):
+        starts = array("d")
+        ends = array("d")
+        for s, e in sorted(intervals.values()):
+            if ends and s <= ends[-1]:
+                if e > ends[-1]:
+                    ends[-1] = e
+            else:
+                starts.append(s)
+                ends.append(e)
+        self.starts = starts
+        self.ends = ends
+        self.version = version
+
+    @classmethod
+    def load(cls, user_id: int, version: int | None = None) -> BusyTimeline:
+        """
+        Timeline of the user's tasks that have not finished yet, read from the database.
+        """
+        rows = (
+            Task.objects
+            .filter(user_id=user_id, finished_at__gt=timezone.now())
+            .timed()
+            .order_by()
+            .values_list("id", "started_at", "finished_at")
+        )
+        return cls(
+            {
+                task_id: (started_at.timestamp(), finished_at.timestamp())
+                for task_id, started_at, finished_at in rows
+                if started_at < finished_at
+            },
+            version,
+        )
+
+    def busy_between(self, start: float, end: float) -> list[tuple[float, float]]:
+        busy = []
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            busy.append((self.starts[i], self.ends[i]))
+            i += 1
+        return busy
+
+    def free_slots(
+        self,
+        start: datetime,
+        end: datetime,
+        *,
+        wake_up_time: time | None = None,
+        bed_time: time | None = None,
+        min_minutes: int = MIN_FREE_SLOT_MINUTES,
+    ) -> list[tuple[datetime, datetime]]:
+        """Free slots between start and end (aware datetimes) of at least min_minutes."""
+        if end <= start:
+            return []
+
+        a, b = start.timestamp(), end.timestamp()
+        min_seconds = min_minutes * 60
+        slots = []
+        cursor = a
+        for s, e in heapq.merge(self.busy_between(a, b), sleep_windows(start, end, wake_up_time, bed_time)):
+            if s >= b:
+                break
+            if e <= cursor:
+                continue
+            if s > cursor and s - cursor >= min_seconds:
+                slots.append((cursor, s))
+            cursor = max(cursor, e)
+        if b - cursor >= min_seconds:
+            slots.append((cursor, b))
+
+        return [
+            (datetime.fromtimestamp(s, tz=dt_timezone.utc), datetime.fromtimestamp(e, tz=dt_timezone.utc))
+            for s, e in slots
+        ]
+
+
+def sleep_windows(start: datetime, end: datetime, wake_up_time: time | None, bed_time: time | None) -> list[tuple[float, float]]:
+    if wake_up_time is None or bed_time is None or wake_up_time == bed_time:
+        return []
+
+    tz = timezone.get_current_timezone()
+    day = timezone.localtime(start, tz).date() - timedelta(days=1)
+    last_day = timezone.localtime(end, tz).date()
+
+    windows = []
+    while day <= last_day:
+        sleep_start = timezone.make_aware(datetime.combine(day, bed_time), tz)
+        sleep_end = timezone.make_aware(datetime.combine(day, wake_up_time), tz)
+        if sleep_end <= sleep_start:
+            sleep_end = timezone.make_aware(datetime.combine(day + timedelta(days=1), wake_up_time), tz)
+        windows.append((sleep_start.timestamp(), sleep_end.timestamp()))
+        day += timedelta(days=1)
+    return windows
+
+
+class FreeTimeEngine:
+    """
+    Per-process cache of users' busy timelines (only tasks that have not
+    finished yet), keyed by the user's shared data version. Every task write,
+    bulk ones included, moves that version (see task.broadcasts), so a write
+    made by any process reloads the timeline on its next read. Without a
+    shared version store nothing is kept between calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timelines: OrderedDict[int, BusyTimeline] = OrderedDict()
+
+    def _timeline(self, user_id: int) -> BusyTimeline:
+        versions = get_versions(data_version(user_id))
+        if versions is None:
+            return BusyTimeline.load(user_id)
+        version = versions[0]
+
+        with self._lock:
+            timeline = self._timelines.get(user_id)
+            if timeline is not None and timeline.version == version:
+                self._timelines.move_to_end(user_id)
+                return timeline
+
+        # Read before loading: a write committed in between only reloads it again
+        timeline = BusyTimeline.load(user_id, version)
+        with self._lock:
+            self._timelines[user_id] = timeline
+            self._timelines.move_to_end(user_id)
+            while len(self._timelines) > MAX_CACHED_USERS:
+                self._timelines.popitem(last=False)
+        return timeline
+
+    def free_slots(
+        self,
+        user_id: int,
+        start: datetime,
+        end: datetime,
+        *,
+        wake_up_time: time | None = None,
+        bed_time: time | None = None,
+        min_minutes: int = MIN_FREE_SLOT_MINUTES,
+    ) -> list[tuple[datetime, datetime]]:
+        """Free slots of user_id, see BusyTimeline.free_slots."""
+        if end <= start:
+            return []
+        return self._timeline(user_id).free_slots(
+            start, end, wake_up_time=wake_up_time, bed_time=bed_time, min_minutes=min_minutes,
+        )
+
+
+free_time_engine = FreeTimeEngine()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Literal
+
+from infrastructure.ai.openrouter_planner import ScheduledResult, TimeSlot
+
+
+ConcentrationLevel = Literal["deep", "medium", "light"]
+
+
+@dataclass(frozen=True)
+class ProductivityPeriod:
+    name: str
+    start: datetime
+    end: datetime
+
+
+# Biorhythm phases, in hours after waking up: (name, from, to).
+# The evening dip additionally starts no later than EVENING_DIP_BEFORE_BED
+# before going to bed.
+PHASES = [
+    ("Раскачка", 0, 2),
+    ("Первый пик", 2, 5),
+    ("Спад", 5, 9),
+    ("Второй пик", 9, 12),
+    ("Вечерний спад", 12, 24),
+]
+EVENING_DIP_BEFORE_BED = timedelta(hours=3)
+
+# How well each phase suits a concentration level; the highest score wins,
+# ties go to the earliest start.
+PHASE_SCORES: dict[str, dict[str, int]] = {
+    "deep": {"Первый пик": 4, "Второй пик": 3, "Раскачка": 2, "Спад": 1, "Вечерний спад": 0},
+    "medium": {"Второй пик": 4, "Первый пик": 3, "Раскачка": 2, "Спад": 2, "Вечерний спад": 1},
+    "light": {"Раскачка": 1, "Первый пик": 1, "Спад": 1, "Второй пик": 1, "Вечерний спад": 1},
+}
+
+
+def _as_time(value: time | str) -> time:
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def calculate_productivity_periods(wake_up_time: time | str, bed_time: time | str, day: date) -> list[ProductivityPeriod]:
+    """Biorhythm phases of the waking day that starts on `day`."""
+    wake_dt = datetime.combine(day, _as_time(wake_up_time))
+    bed_dt = datetime.combine(day, _as_time(bed_time))
+    if bed_dt <= wake_dt:
+        bed_dt += timedelta(days=1)
+
+    evening_start = min(wake_dt + timedelta(hours=PHASES[-1][1]), bed_dt - EVENING_DIP_BEFORE_BED)
+
+    periods = []
+    for name, from_hours, to_hours in PHASES:
+        start = wake_dt + timedelta(hours=from_hours)
+        end = min(wake_dt + timedelta(hours=to_hours), bed_dt)
+        if name == "Вечерний спад":
+            start = max(evening_start, wake_dt)
+        else:
+            end = min(end, evening_start)
+        if start < end:
+            periods.append(ProductivityPeriod(name=name, start=start, end=end))
+    return periods
+
+
+def find_best_slot(
+    free_slots: list[TimeSlot],
+    duration_minutes: int,
+    concentration_level: ConcentrationLevel,
+    wake_up_time: time | str,
+    bed_time: time | str,
+    deadline: datetime | None = None,
+    now: datetime | None = None,
+) -> ScheduledResult:
+    """
+    Pick a block of duration_minutes inside free_slots, preferring the
+    biorhythm phase that suits concentration_level. All datetimes are naive
+    local times, as produced for the planner.
+    """
+    duration = timedelta(minutes=duration_minutes)
+    scores = PHASE_SCORES.get(concentration_level, PHASE_SCORES["light"])
+    periods_by_day: dict[date, list[ProductivityPeriod]] = {}
+
+    best: tuple[int, datetime, str] | None = None
+    for slot in sorted(free_slots, key=lambda s: s.start):
+        slot_start = max(slot.start, now) if now else slot.start
+        slot_end = min(slot.end, deadline) if deadline else slot.end
+        if slot_end - slot_start < duration:
+            continue
+
+        day = slot_start.date() - timedelta(days=1)
+        while day <= slot_end.date():
+            if day not in periods_by_day:
+                periods_by_day[day] = calculate_productivity_periods(wake_up_time, bed_time, day)
+            for period in periods_by_day[day]:
+                if period.end <= slot_start or period.start >= slot_end:
+                    continue
+                start = max(slot_start, period.start)
+                if start + duration > slot_end:
+                    continue
+                candidate = (scores.get(period.name, 0), start, period.name)
+                if best is None or candidate[0] > best[0] or (candidate[0] == best[0] and candidate[1] < best[1]):
+                    best = candidate
+            day += timedelta(days=1)
+
+        if best is None:
+            # Slot lies outside every waking phase (e.g. sleep settings changed);
+            # it is still free, so keep it as the weakest candidate.
+            best = (-1, slot_start, "")
+
+    if best is None:
+        return ScheduledResult(
+            is_scheduled=False,
+            slot=None,
+            message=f"Нет свободного окна длительностью {duration_minutes} мин до дедлайна",
+        )
+
+    _score, start, period_name = best
+    message = f"Запланировано на фазу «{period_name}»" if period_name else "Запланировано в ближайшее свободное окно"
+    return ScheduledResult(
+        is_scheduled=True,
+        slot=TimeSlot(start=start, end=start + duration),
+        message=message,
+    )
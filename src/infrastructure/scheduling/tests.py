@@ -0,0 +1,231 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from infrastructure.ai.openrouter_planner import TimeSlot
+from infrastructure.comon.cache_versions import KEY_PREFIX, data_version
+from infrastructure.scheduling.free_time import BusyTimeline, FreeTimeEngine, sleep_windows
+from infrastructure.scheduling.planner import calculate_productivity_periods, find_best_slot
+from task.models import Status, Task
+from user.models import User
+
+
+DAY = date(2025, 3, 10)
+
+
+def at(hour: int, minute: int = 0, day: date = DAY) -> datetime:
+    return datetime.combine(day, time(hour, minute))
+
+
+def slot(start: datetime, end: datetime) -> TimeSlot:
+    return TimeSlot(start=start, end=end)
+
+
+class CalculateProductivityPeriodsTests(SimpleTestCase):
+    def test_regular_day(self):
+        periods = calculate_productivity_periods("07:00", "23:00", DAY)
+
+        self.assertEqual(
+            [(period.name, period.start, period.end) for period in periods],
+            [
+                ("Раскачка", at(7), at(9)),
+                ("Первый пик", at(9), at(12)),
+                ("Спад", at(12), at(16)),
+                ("Второй пик", at(16), at(19)),
+                ("Вечерний спад", at(19), at(23)),
+            ],
+        )
+
+    def test_accepts_time_objects(self):
+        self.assertEqual(
+            calculate_productivity_periods(time(7), time(23), DAY),
+            calculate_productivity_periods("07:00", "23:00", DAY),
+        )
+
+    def test_short_day_past_midnight(self):
+        periods = calculate_productivity_periods("22:00", "06:00", DAY)
+        next_day = date(2025, 3, 11)
+
+        self.assertEqual(
+            [(period.name, period.start, period.end) for period in periods],
+            [
+                ("Раскачка", at(22), at(0, day=next_day)),
+                ("Первый пик", at(0, day=next_day), at(3, day=next_day)),
+                ("Вечерний спад", at(3, day=next_day), at(6, day=next_day)),
+            ],
+        )
+
+
+class FindBestSlotTests(SimpleTestCase):
+    def find(self, free_slots, duration_minutes=60, concentration_level="deep", **kwargs):
+        return find_best_slot(free_slots, duration_minutes, concentration_level, "07:00", "23:00", **kwargs)
+
+    def test_no_free_slots(self):
+        result = self.find([])
+
+        self.assertFalse(result.is_scheduled)
+        self.assertIsNone(result.slot)
+
+    def test_deadline_before_every_free_slot(self):
+        result = self.find([slot(at(10), at(12)), slot(at(14), at(18))], deadline=at(9))
+
+        self.assertFalse(result.is_scheduled)
+
+    def test_deadline_cuts_slot_short(self):
+        result = self.find([slot(at(10), at(12))], duration_minutes=90, deadline=at(11))
+
+        self.assertFalse(result.is_scheduled)
+
+    def test_slot_shorter_than_duration_is_skipped(self):
+        result = self.find([slot(at(9), at(10)), slot(at(14), at(17))], duration_minutes=90)
+
+        self.assertTrue(result.is_scheduled)
+        self.assertEqual((result.slot.start, result.slot.end), (at(14), at(15, 30)))
+
+    def test_only_short_slots(self):
+        result = self.find([slot(at(9), at(9, 30)), slot(at(14), at(14, 45))], duration_minutes=60)
+
+        self.assertFalse(result.is_scheduled)
+
+    def test_now_moves_slot_start(self):
+        result = self.find([slot(at(9), at(12))], now=at(10, 15))
+
+        self.assertEqual(result.slot.start, at(10, 15))
+
+    def test_prefers_phase_of_concentration_level(self):
+        free_slots = [slot(at(7), at(8)), slot(at(10), at(11)), slot(at(17), at(18))]
+
+        self.assertEqual(self.find(free_slots, concentration_level="deep").slot.start, at(10))
+        self.assertEqual(self.find(free_slots, concentration_level="medium").slot.start, at(17))
+
+    def test_block_starts_at_phase_boundary_inside_slot(self):
+        result = self.find([slot(at(7), at(12))])
+
+        self.assertEqual(result.slot.start, at(9))
+        self.assertEqual(result.message, "Запланировано на фазу «Первый пик»")
+
+    def test_equal_scores_go_to_earliest_start(self):
+        # Раскачка and Спад score the same for medium
+        free_slots = [slot(at(13), at(14)), slot(at(7, 30), at(8, 30))]
+
+        self.assertEqual(self.find(free_slots, concentration_level="medium").slot.start, at(7, 30))
+        self.assertEqual(self.find(free_slots, concentration_level="light").slot.start, at(7, 30))
+
+    def test_unknown_level_scores_like_light(self):
+        free_slots = [slot(at(17), at(18)), slot(at(7), at(8))]
+
+        self.assertEqual(self.find(free_slots, concentration_level="unknown").slot.start, at(7))
+
+    def test_slot_outside_waking_phases(self):
+        result = self.find([slot(at(1), at(3))])
+
+        self.assertTrue(result.is_scheduled)
+        self.assertEqual(result.slot.start, at(1))
+        self.assertEqual(result.message, "Запланировано в ближайшее свободное окно")
+
+
+def local(hour: int, minute: int = 0, day: date = DAY) -> datetime:
+    return timezone.make_aware(at(hour, minute, day))
+
+
+def span(start: datetime, end: datetime) -> tuple[float, float]:
+    return start.timestamp(), end.timestamp()
+
+
+class SleepWindowsTests(SimpleTestCase):
+    def test_night_across_midnight(self):
+        windows = sleep_windows(local(12), local(12, day=date(2025, 3, 11)), time(7), time(23))
+
+        self.assertEqual(windows, [
+            span(local(23, day=date(2025, 3, 9)), local(7)),
+            span(local(23), local(7, day=date(2025, 3, 11))),
+            span(local(23, day=date(2025, 3, 11)), local(7, day=date(2025, 3, 12))),
+        ])
+
+    def test_sleep_within_one_day(self):
+        windows = sleep_windows(local(12), local(13), time(9), time(1))
+
+        self.assertEqual(windows[1], span(local(1), local(9)))
+
+    def test_no_sleep_without_both_times(self):
+        self.assertEqual(sleep_windows(local(0), local(23), None, time(23)), [])
+        self.assertEqual(sleep_windows(local(0), local(23), time(7), time(7)), [])
+
+
+class BusyTimelineTests(SimpleTestCase):
+    def timeline(self, *intervals):
+        return BusyTimeline({i: span(s, e) for i, (s, e) in enumerate(intervals)})
+
+    def test_overlapping_intervals_are_merged(self):
+        timeline = self.timeline((local(10), local(11)), (local(10, 30), local(12)), (local(12), local(13)), (local(15), local(16)))
+
+        self.assertEqual(
+            list(zip(timeline.starts, timeline.ends)),
+            [span(local(10), local(13)), span(local(15), local(16))],
+        )
+
+    def test_free_slots_between_busy_and_sleep(self):
+        timeline = self.timeline((local(10), local(11)), (local(14), local(15)))
+
+        slots = timeline.free_slots(local(9), local(23, 30), wake_up_time=time(7), bed_time=time(23))
+
+        self.assertEqual(slots, [
+            (local(9), local(10)),
+            (local(11), local(14)),
+            (local(15), local(23)),
+        ])
+
+    def test_short_gaps_are_dropped(self):
+        timeline = self.timeline((local(10), local(11)), (local(11, 10), local(12)))
+
+        slots = timeline.free_slots(local(10), local(13), min_minutes=15)
+
+        self.assertEqual(slots, [(local(12), local(13))])
+
+    def test_busy_across_range(self):
+        timeline = self.timeline((local(8), local(20)))
+
+        self.assertEqual(timeline.free_slots(local(9), local(18)), [])
+        self.assertEqual(timeline.free_slots(local(18), local(9)), [])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}, CACHE_VERSIONS_SHARED=True)
+class FreeTimeEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="owner", password="secret")
+        self.status = Status.objects.create(name="Новая", type="new", color="#aaa")
+        self.start = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+        self.end = self.start + timedelta(hours=4)
+        self.engine = FreeTimeEngine()
+
+    def add_task(self, hours: int):
+        # Without signals, so the data version only moves when the test says so
+        Task.objects.bulk_create([Task(
+            user=self.user, name="Задача", status=self.status,
+            started_at=self.start + timedelta(hours=hours), finished_at=self.start + timedelta(hours=hours + 1),
+        )])
+
+    def slots(self):
+        return self.engine.free_slots(self.user.id, self.start, self.end)
+
+    def test_timeline_is_kept_until_data_version_moves(self):
+        self.assertEqual(self.slots(), [(self.start, self.end)])
+
+        self.add_task(1)
+        self.assertEqual(self.slots(), [(self.start, self.end)])
+
+        cache.incr(KEY_PREFIX + data_version(self.user.id))
+        self.assertEqual(self.slots(), [
+            (self.start, self.start + timedelta(hours=1)),
+            (self.start + timedelta(hours=2), self.end),
+        ])
+
+    @override_settings(CACHE_VERSIONS_SHARED=False)
+    def test_nothing_kept_without_shared_versions(self):
+        self.slots()
+        self.add_task(1)
+
+        self.assertEqual(len(self.slots()), 2)
@@ -1,19 +1,77 @@
 import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from task.broadcasts import build_task_payloads
+from task.event_stream import task_event_stream
+from task.models import Task
+
+logger = logging.getLogger(__name__)
+
+MAX_RESYNC_TASKS = 100
+
 class TaskConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
+        self.last_seq = None
         if self.user.is_authenticated:
+            last_seq = self.requested_last_seq()
+            if last_seq is None:
+                # Fresh page: start at the current head, read before joining
+                # the group so nothing published in between is lost.
+                try:
+                    last_seq = await task_event_stream.head(self.user.id)
+                except Exception:
+                    logger.exception("Task stream: head failed for user_id=%s", self.user.id)
             self.group_name = f"user_{self.user.id}"
             await self.channel_layer.group_add(
                 self.group_name,
                 self.channel_name
             )
             await self.accept()
+            await self.resume(last_seq)
         else:
             await self.close()
 
+    def requested_last_seq(self):
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            return int(query["last_seq"][0])
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    async def resume(self, last_seq):
+        """
+        Send what happened after last_seq. Live events are only dispatched
+        after connect returns, so they come after the replay; the ones
+        already replayed are dropped in task_update.
+        """
+        if last_seq is None:
+            return
+
+        try:
+            head, missed = await task_event_stream.replay(self.user.id, last_seq)
+        except Exception:
+            logger.exception("Task stream: replay failed for user_id=%s", self.user.id)
+            self.last_seq = None
+            await self.send(text_data=json.dumps({"type": "resync_required", "seq": None}))
+            return
+
+        if missed is None:
+            # Too old or too much: the client reloads its data instead
+            self.last_seq = head
+            await self.send(text_data=json.dumps({"type": "resync_required", "seq": head}))
+            return
+
+        for message in missed:
+            await self.send(text_data=json.dumps(message))
+            head = max(head, message["seq"])
+        self.last_seq = head
+        await self.send(text_data=json.dumps({"type": "stream_position", "seq": head}))
+
     async def disconnect(self, close_code):
         if hasattr(self, 'user') and self.user.is_authenticated:
             await self.channel_layer.group_discard(
@@ -21,5 +79,39 @@ class TaskConsumer(AsyncWebsocketConsumer):
                 self.channel_name
             )
 
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or "{}")
+        except json.JSONDecodeError:
+            return
+
+        if data.get("action") == "resync":
+            await self.send_snapshots(data.get("task_ids") or [])
+
+    async def send_snapshots(self, task_ids):
+        # A client that missed a version asks for full copies of these tasks
+        try:
+            task_ids = [int(task_id) for task_id in task_ids][:MAX_RESYNC_TASKS]
+        except (TypeError, ValueError):
+            return
+
+        @sync_to_async
+        def load():
+            own_ids = Task.objects.filter(id__in=task_ids, user_id=self.user.id).values_list("id", flat=True)
+            return build_task_payloads(list(own_ids))
+
+        for task in (await load()).values():
+            await self.send(text_data=json.dumps({
+                "type": "task_update",
+                "action": "snapshot",
+                "task": task,
+            }))
+
     async def task_update(self, event):
-        await self.send(text_data=json.dumps(event['message']))
+        message = event['message']
+        seq = message.get("seq")
+        if seq is not None and self.last_seq is not None:
+            if seq <= self.last_seq:
+                return
+            self.last_seq = seq
+        await self.send(text_data=json.dumps(message))
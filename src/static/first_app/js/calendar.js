@@ -828,6 +828,10 @@ function renderTasksOnCalendar(tasks) {
 }
 
 // Listen for WebSocket updates
+document.addEventListener('taskResync', function() {
+    loadWeek(currentWeekStartIso);
+});
+
 document.addEventListener('taskUpdate', function(e) {
     const data = e.detail;
     // data = { type: 'task_update', action: 'create'|'update', task: {...} }
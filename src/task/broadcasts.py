@@ -0,0 +1,142 @@
+import functools
+import logging
+import weakref
+
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import transaction
+from django.utils.decorators import sync_and_async_middleware
+
+from domain.schemas.task.main import TaskRetrieveDTO
+from infrastructure.comon.cache_versions import bump_version, data_version
+
+
+logger = logging.getLogger(__name__)
+
+# TaskRetrieveDTO fields a plain Task.save() may change
+SCALAR_FIELDS = ("name", "description", "started_at", "finished_at", "deadline_at", "status", "sprint", "category", "planning")
+
+# { task_id: TaskChange } for the request being handled
+_request_changes: ContextVar[dict | None] = ContextVar("task_broadcast_changes", default=None)
+
+
+class _TransactionChanges(dict):
+    """
+    { task_id: TaskChange } of the transaction being run on a connection.
+    """
+
+
+class TaskChange:
+    __slots__ = ("user_id", "fields", "count")
+
+    def __init__(self, user_id: int, fields):
+        self.user_id = user_id
+        self.fields = set(fields)
+        self.count = 1
+
+
+def _task_owner(task_id: int) -> int | None:
+    from task.models import Task
+
+    return Task.objects.filter(id=task_id).values_list("user_id", flat=True).first()
+
+
+def _write_event(task_id: int, action: str, user_id: int, fields):
+    from task.models import TaskOutbox
+
+    TaskOutbox.objects.create(user_id=user_id, task_id=task_id, action=action, fields=sorted(fields))
+    # Every task change passes through here, bulk writes included
+    bump_version(data_version(user_id))
+
+
+def _ensure_pending(changes: dict):
+    """
+    The relay may pick up the event written on a task's first change before
+    the later ones happen, so tasks changed more than once during the unit
+    get a closing event covering all their fields. The relay collapses both
+    if they land in the same batch.
+    """
+    for task_id, change in changes.items():
+        if change.count > 1:
+            _write_event(task_id, "update", change.user_id, change.fields)
+
+
+def queue_task_update(task_id: int, action: str = "update", user_id: int | None = None, fields=("*",)):
+    """
+    Record a task change in the outbox, on the same connection and therefore
+    in the same transaction as the change. Repeated changes of one task are
+    recorded once per request (TaskBroadcastMiddleware) or per transaction.
+    """
+    if not task_id:
+        return
+
+    changes = _request_changes.get()
+    if changes is None:
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            user_id = user_id or _task_owner(task_id)
+            if user_id:
+                _write_event(task_id, action, user_id, fields)
+            return
+
+        pending = getattr(connection, "task_changes", None)
+        changes = pending() if pending is not None else None
+        if changes is None:
+            # Only the on_commit callback holds the dict, so it is gone once the
+            # transaction commits or rolls back (a rolled back savepoint drops
+            # its callbacks as well), and the next change starts over.
+            changes = _TransactionChanges()
+            transaction.on_commit(functools.partial(_ensure_pending, changes))
+            connection.task_changes = weakref.ref(changes)
+
+    if task_id in changes:
+        changes[task_id].fields.update(fields)
+        changes[task_id].count += 1
+        return
+
+    user_id = user_id or _task_owner(task_id)
+    if user_id:
+        _write_event(task_id, action, user_id, fields)
+        changes[task_id] = TaskChange(user_id, fields)
+
+
+def build_task_payloads(task_ids) -> dict[int, dict]:
+    from task.models import Task
+
+    tasks = (
+        Task.objects
+        .filter(id__in=list(task_ids))
+        .select_related("user", "status", "sprint", "category")
+        .prefetch_related("tags", "subtasks")
+    )
+    return {task.id: TaskRetrieveDTO.model_validate(task).model_dump(mode="json") for task in tasks}
+
+
+@sync_and_async_middleware
+def TaskBroadcastMiddleware(get_response):
+    """
+    Scopes task change de-duplication to one request.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _request_changes.set({})
+            try:
+                return await get_response(request)
+            finally:
+                changes = _request_changes.get()
+                _request_changes.reset(token)
+                if changes:
+                    await sync_to_async(_ensure_pending)(changes)
+    else:
+        def middleware(request):
+            token = _request_changes.set({})
+            try:
+                return get_response(request)
+            finally:
+                changes = _request_changes.get()
+                _request_changes.reset(token)
+                if changes:
+                    _ensure_pending(changes)
+
+    return middleware
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import weakref
+from collections import deque
+
+from django.conf import settings
+
+
+STREAM_MAXLEN = 1000
+STREAM_TTL_SECONDS = 24 * 60 * 60
+REPLAY_LIMIT = 500
+
+# Assigns the next per-user sequence number and appends the message under it.
+# The counter outlives the stream, so a client older than the oldest kept
+# entry is detected as a gap instead of being replayed from a restarted count.
+_PUBLISH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[2])
+local last = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)[1]
+if last then
+    local last_seq = tonumber(string.match(last[1], '^(%d+)'))
+    if seq <= last_seq then
+        seq = last_seq + 1
+        redis.call('SET', KEYS[2], seq)
+    end
+end
+redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], seq .. '-0', 'm', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return seq
+"""
+
+
+class RedisTaskEventStream:
+    """
+    Per-user sequence of relayed task messages kept in a capped Redis stream
+    (task_events:{user_id}), so a reconnecting socket can be sent what it
+    missed. Clients are bound to an event loop, so one is kept per running
+    loop.
+    """
+
+    def __init__(self, host: str, port: int, maxlen: int = STREAM_MAXLEN, ttl_seconds: int = STREAM_TTL_SECONDS):
+        self.host = host
+        self.port = port
+        self.maxlen = maxlen
+        self.ttl_seconds = ttl_seconds
+        self._clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        from redis.asyncio import Redis
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = Redis(host=self.host, port=self.port)
+        return client
+
+    @staticmethod
+    def _keys(user_id: int) -> tuple[str, str]:
+        return f"task_events:{user_id}", f"task_events_seq:{user_id}"
+
+    async def publish(self, user_id: int, message: dict) -> int:
+        """
+        Number the message, store it for replay and return the message with
+        its "seq" set.
+        """
+        client = self._client()
+        script = client.register_script(_PUBLISH_SCRIPT)
+        # The sequence is only known inside the script, the stored copy gets it on read.
+        seq = int(await script(keys=self._keys(user_id), args=[json.dumps(message), self.maxlen, self.ttl_seconds]))
+        message["seq"] = seq
+        return seq
+
+    async def head(self, user_id: int) -> int:
+        value = await self._client().get(self._keys(user_id)[1])
+        return int(value or 0)
+
+    async def replay(self, user_id: int, last_seq: int, limit: int = REPLAY_LIMIT) -> tuple[int, list[dict] | None]:
+        """
+        Return the current head and the messages after last_seq, or None
+        instead of the messages when they are no longer all kept (or more
+        than limit) and the client has to reload.
+        """
+        stream_key, seq_key = self._keys(user_id)
+        async with self._client().pipeline(transaction=False) as pipe:
+            pipe.get(seq_key)
+            pipe.xrange(stream_key, min=f"{last_seq + 1}-0", max="+", count=limit + 1)
+            head, entries = await pipe.execute()
+
+        head = int(head or 0)
+        if last_seq == head:
+            return head, []
+        if last_seq > head or not entries or len(entries) > limit:
+            return head, None
+
+        messages = []
+        for entry_id, values in entries:
+            seq = int(entry_id.split(b"-", 1)[0])
+            if not messages and seq != last_seq + 1:
+                return head, None
+            message = json.loads(values[b"m"])
+            message["seq"] = seq
+            messages.append(message)
+        return head, messages
+
+
+class LocalTaskEventStream:
+    """
+    In-process stand-in for RedisTaskEventStream, for setups where the relay
+    and the sockets share one process (InMemoryChannelLayer).
+    """
+
+    def __init__(self, maxlen: int = STREAM_MAXLEN):
+        self.maxlen = maxlen
+        self._streams: dict[int, tuple[list[int], deque]] = {}
+        self._lock = threading.Lock()
+
+    def _stream(self, user_id: int) -> tuple[list[int], deque]:
+        stream = self._streams.get(user_id)
+        if stream is None:
+            stream = self._streams[user_id] = ([0], deque(maxlen=self.maxlen))
+        return stream
+
+    async def publish(self, user_id: int, message: dict) -> int:
+        with self._lock:
+            counter, entries = self._stream(user_id)
+            counter[0] += 1
+            message["seq"] = counter[0]
+            entries.append(json.dumps(message))
+            return counter[0]
+
+    async def head(self, user_id: int) -> int:
+        with self._lock:
+            return self._stream(user_id)[0][0]
+
+    async def replay(self, user_id: int, last_seq: int, limit: int = REPLAY_LIMIT) -> tuple[int, list[dict] | None]:
+        with self._lock:
+            counter, entries = self._stream(user_id)
+            head = counter[0]
+            missed = head - last_seq
+            if missed == 0:
+                return head, []
+            if missed < 0 or missed > min(limit, len(entries)):
+                return head, None
+            return head, [json.loads(entry) for entry in list(entries)[-missed:]]
+
+
+def _build_stream():
+    layer = settings.CHANNEL_LAYERS.get("default", {})
+    if layer.get("BACKEND", "").startswith("channels_redis."):
+        host, port = layer["CONFIG"]["hosts"][0]
+        return RedisTaskEventStream(host, port)
+    return LocalTaskEventStream()
+
+
+task_event_stream = _build_stream()
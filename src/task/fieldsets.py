@@ -0,0 +1,146 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from domain.schemas.task.common import CategoryRetriveDTO, SprintRetriveDTO, StatusRetriveDTO, SubtaskRetrieveDTO, \
+    TagRetrieveDTO
+from domain.schemas.user.main import UserRetriveDTO
+from task.models import Subtask
+
+
+# Related data a task read can include: { name: (DTO, loaded with) }
+RELATIONS = {
+    "status": (StatusRetriveDTO, None),  # from task.status_registry, set by the view
+    "sprint": (SprintRetriveDTO, "select"),
+    "category": (CategoryRetriveDTO, "select"),
+    "user": (UserRetriveDTO, "select"),
+    "tags": (TagRetrieveDTO, "prefetch"),
+    "subtasks": (SubtaskRetrieveDTO, "prefetch"),
+}
+
+
+def _subtask_count(completed: bool | None = None):
+    subtasks = Subtask.objects.filter(task_id=OuterRef("pk"))
+    if completed is not None:
+        subtasks = subtasks.filter(completed=completed)
+    counted = subtasks.order_by().values("task_id").annotate(count=Count("id")).values("count")
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+class FieldsetSpec:
+    """
+    What a task read endpoint can return and returns by default.
+    fields are task columns, include is related or computed data, columns
+    are loaded whatever is selected because the view itself needs them.
+    """
+
+    def __init__(self, fields, include, default_fields, default_include, required=(), columns=()):
+        self.fields = tuple(fields)
+        self.include = tuple(include)
+        self.default_fields = tuple(default_fields)
+        self.default_include = tuple(default_include)
+        self.required = tuple(required)
+        self.columns = tuple(columns)
+
+
+BOARD_CARD = FieldsetSpec(
+    fields=("id", "name", "description", "started_at", "finished_at", "deadline_at", "planning"),
+    include=("tags", "subtasks", "progress"),
+    default_fields=("id", "name", "finished_at", "deadline_at", "planning"),
+    default_include=("tags", "progress"),
+    required=("id",),
+    columns=("status", "created_at"),
+)
+
+TASK_DETAIL = FieldsetSpec(
+    fields=("id", "name", "description", "created_at", "started_at", "finished_at", "deadline_at", "version", "planning"),
+    include=("status", "sprint", "category", "user", "tags", "subtasks", "lifecycle"),
+    default_fields=(
+        "id", "name", "description", "created_at", "started_at", "finished_at", "deadline_at", "version", "planning",
+    ),
+    default_include=("status", "sprint", "category", "tags", "subtasks", "lifecycle"),
+    required=("id",),
+)
+
+CALENDAR_ENTRY = FieldsetSpec(
+    fields=("description", "created_at", "deadline_at"),
+    include=("status", "category", "tags"),
+    default_fields=(),
+    default_include=(),
+    columns=("name", "started_at", "finished_at"),
+)
+
+
+class TaskFieldset:
+    """
+    ?fields= and ?include= of a task read endpoint, comma separated. Only
+    the selected columns are loaded, only the selected relations are joined
+    or prefetched, and dump() returns just the selected keys.
+    """
+
+    def __init__(self, spec: FieldsetSpec, fields, include):
+        self.spec = spec
+        self.fields = tuple(dict.fromkeys((*spec.required, *fields)))
+        self.include = tuple(dict.fromkeys(include))
+
+    @staticmethod
+    def _names(value) -> list[str]:
+        return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+    @classmethod
+    def from_query(cls, query_params, spec: FieldsetSpec) -> "TaskFieldset":
+        """
+        Raises ValueError naming the fields or relations spec does not have.
+        """
+        fields = cls._names(query_params.get("fields")) if "fields" in query_params else spec.default_fields
+        include = cls._names(query_params.get("include")) if "include" in query_params else spec.default_include
+
+        unknown = [name for name in fields if name not in spec.fields]
+        unknown += [name for name in include if name not in spec.include]
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+        return cls(spec, fields, include)
+
+    def apply(self, qs):
+        columns = {"id", *self.fields, *self.spec.columns}
+        select = []
+        prefetch = []
+        for name in self.include:
+            if name == "status":
+                columns.add("status")
+            elif name == "lifecycle":
+                # Open segment of a task without status intervals
+                columns.update(("status", "created_at"))
+            elif name == "progress":
+                qs = qs.annotate(
+                    subtasks_total=_subtask_count(),
+                    subtasks_completed=_subtask_count(completed=True),
+                )
+            elif name in RELATIONS:
+                _, loaded_with = RELATIONS[name]
+                if loaded_with == "select":
+                    columns.add(name)
+                    select.append(name)
+                else:
+                    prefetch.append(name)
+
+        qs = qs.only(*columns)
+        if select:
+            qs = qs.select_related(*select)
+        if prefetch:
+            qs = qs.prefetch_related(*prefetch)
+        return qs
+
+    def dump(self, task) -> dict:
+        data = {name: getattr(task, name) for name in self.fields}
+        for name in self.include:
+            if name == "progress":
+                data["subtasks_total"] = task.subtasks_total
+                data["subtasks_completed"] = task.subtasks_completed
+            elif name in RELATIONS:
+                dto, loaded_with = RELATIONS[name]
+                if loaded_with == "prefetch":
+                    data[name] = [dto.model_validate(item) for item in getattr(task, name).all()]
+                else:
+                    value = getattr(task, name)
+                    data[name] = None if value is None else dto.model_validate(value)
+        return data
@@ -0,0 +1,44 @@
+from django.utils import timezone
+
+
+HISTORY_TEXT_LIMIT = 180
+
+
+def to_naive(dt):
+    """
+    Local wall-clock time of dt, as the planner and the forms use it.
+    """
+    if dt is None:
+        return None
+    if timezone.is_aware(dt):
+        return timezone.make_naive(dt, timezone.get_current_timezone())
+    return dt
+
+
+def to_aware(dt):
+    if dt is None:
+        return None
+    if timezone.is_naive(dt):
+        return timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt
+
+
+def format_dt(value) -> str:
+    if value is None:
+        return "—"
+    try:
+        return value.strftime("%d.%m.%Y %H:%M")
+    except Exception:
+        return str(value)
+
+
+def history_text(value) -> str:
+    """
+    value as a single line short enough for a TaskHistory row.
+    """
+    if value is None:
+        return "—"
+    text = str(value).replace("\n", " ").strip()
+    if len(text) > HISTORY_TEXT_LIMIT:
+        return text[:HISTORY_TEXT_LIMIT] + "…"
+    return text
@@ -0,0 +1,66 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+
+def _percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * share) - 1)]
+
+
+def _request_cycle() -> tuple[float, float]:
+    """
+    What one API request does with the database: connect (or take a pooled
+    connection), query, and give the connection back on request_finished.
+    """
+    started = time.perf_counter()
+    connection.ensure_connection()
+    connected = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    close_old_connections()
+    return connected - started, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = "Measure per-request connection setup and total database time under concurrent requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=20)
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES["default"]
+        pool = database.get("OPTIONS", {}).get("pool")
+        self.stdout.write(
+            f"engine {database['ENGINE']}, "
+            + (f"pool max_size={pool['max_size']}" if pool else f"no pool, CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}")
+        )
+
+        setup, total = asyncio.run(self._run(options["requests"], options["concurrency"]))
+        for name, values in (("connection setup", setup), ("request total", total)):
+            self.stdout.write(
+                f"{name:>16}: mean {statistics.mean(values) * 1000:.3f} ms, "
+                f"p50 {_percentile(values, 0.5) * 1000:.3f} ms, p95 {_percentile(values, 0.95) * 1000:.3f} ms"
+            )
+
+    async def _run(self, requests: int, concurrency: int):
+        setup, total = [], []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                # Like the ASGI handler: each request runs its ORM code in its own thread
+                async with ThreadSensitiveContext():
+                    connect_time, request_time = await sync_to_async(_request_cycle)()
+            setup.append(connect_time)
+            total.append(request_time)
+
+        await asyncio.gather(*(request() for _ in range(requests)))
+        return setup, total
@@ -0,0 +1,96 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from domain.schemas.task.canban import CanbanColumnRetriveDTO
+from domain.schemas.task.common import SubtaskRetrieveDTO, TagRetrieveDTO
+from infrastructure.comon.renderers import ORJSONRenderer
+
+
+def _kanban_board(columns: int, tasks_per_column: int) -> list[CanbanColumnRetriveDTO]:
+    now = timezone.now()
+    description = "<p>" + "Описание задачи с <b>разметкой</b>. " * 20 + "</p>"
+    board = []
+    for column in range(columns):
+        # Cards as TaskFieldset.dump builds them with every BOARD_CARD field selected
+        tasks = [
+            {
+                "id": column * tasks_per_column + i,
+                "name": f"Задача {i}",
+                "description": description,
+                "started_at": now + timedelta(hours=i),
+                "finished_at": now + timedelta(hours=i + 1),
+                "deadline_at": now + timedelta(days=3),
+                "tags": [TagRetrieveDTO(id=t, name=f"тэг {t}") for t in range(3)],
+                "subtasks": [SubtaskRetrieveDTO(id=s, name=f"Подзадача {s}", completed=s % 2 == 0) for s in range(5)],
+            }
+            for i in range(tasks_per_column)
+        ]
+        board.append(CanbanColumnRetriveDTO(id=column, name=f"Статус {column}", color="#A0A0A0", total=len(tasks), tasks=tasks))
+    return board
+
+
+def _calendar_week(tasks: int) -> dict:
+    start = datetime(2026, 1, 5, 8, 0)
+    return {
+        "week_start": "2026-01-05",
+        "week_end": "2026-01-11",
+        "days": [
+            {"iso": f"2026-01-{5 + i:02d}", "date_key": f"{5 + i:02d}.01.2026", "label": f"День, {5 + i}"}
+            for i in range(7)
+        ],
+        "tasks": [
+            {
+                "id": i,
+                "title": f"Задача {i}",
+                "started_at": (start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S"),
+                "ended_at": (start + timedelta(hours=i, minutes=45)).strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            for i in range(tasks)
+        ],
+    }
+
+
+def _best_of(rounds: int, func) -> tuple[float, int]:
+    best, size = float("inf"), 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        size = len(func())
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer (over model_dump()) with ORJSONRenderer (over DTOs) on kanban and calendar payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--columns", type=int, default=8)
+        parser.add_argument("--tasks", type=int, default=100, help="Tasks per kanban column")
+        parser.add_argument("--calendar-tasks", type=int, default=300)
+        parser.add_argument("--rounds", type=int, default=20)
+
+    def handle(self, *args, **options):
+        board = _kanban_board(options["columns"], options["tasks"])
+        week = _calendar_week(options["calendar_tasks"])
+        drf, fast = JSONRenderer(), ORJSONRenderer()
+
+        cases = {
+            "kanban": (
+                lambda: drf.render([column.model_dump() for column in board]),
+                lambda: fast.render(board),
+            ),
+            "calendar": (
+                lambda: drf.render(week),
+                lambda: fast.render(week),
+            ),
+        }
+        for name, (baseline, candidate) in cases.items():
+            base_time, base_size = _best_of(options["rounds"], baseline)
+            fast_time, fast_size = _best_of(options["rounds"], candidate)
+            self.stdout.write(
+                f"{name:>8}: drf {base_time * 1000:.2f} ms ({base_size} B), "
+                f"orjson {fast_time * 1000:.2f} ms ({fast_size} B), x{base_time / fast_time:.1f}"
+            )
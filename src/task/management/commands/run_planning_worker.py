@@ -0,0 +1,46 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+
+from infrastructure.ai.http_client import http_client
+from task.planning import STALE_AFTER, claim_next_job, requeue_stale_jobs, run_job
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run the AI planning worker that schedules tasks queued by TaskAsyncViewSet.create"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._serve(options["concurrency"], options["poll_interval"]))
+
+    async def _serve(self, concurrency: int, poll_interval: float):
+        workers = [asyncio.create_task(self._work(poll_interval)) for _ in range(concurrency)]
+        # Jobs of a worker that died mid-run, in this or any other process
+        workers.append(asyncio.create_task(self._requeue(STALE_AFTER.total_seconds() / 2)))
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            await http_client.close()
+
+    async def _requeue(self, interval: float):
+        while True:
+            requeued = await sync_to_async(requeue_stale_jobs)()
+            if requeued:
+                logger.warning("Requeued %s stale planning jobs", requeued)
+            await asyncio.sleep(interval)
+
+    async def _work(self, poll_interval: float):
+        while True:
+            job = await sync_to_async(claim_next_job)()
+            if job is None:
+                await asyncio.sleep(poll_interval)
+                continue
+            await run_job(job)
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+
+from task.relay import prune_sent, relay_batch
+
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY_SECONDS = 60
+MAX_BACKOFF_SECONDS = 30
+
+
+class Command(BaseCommand):
+    help = "Relay task change events from the outbox to the WebSocket channel layer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        asyncio.run(self._serve(options["poll_interval"]))
+
+    async def _serve(self, poll_interval: float):
+        channel_layer = get_channel_layer()
+        backoff = poll_interval
+        pruned_at = 0.0
+        while True:
+            try:
+                sent, failed = await relay_batch(channel_layer)
+            except Exception:
+                logger.exception("Task relay: batch failed")
+                sent, failed = 0, 1
+
+            if failed:
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                await asyncio.sleep(backoff)
+                continue
+            backoff = poll_interval
+
+            if time.monotonic() - pruned_at > PRUNE_EVERY_SECONDS:
+                await sync_to_async(prune_sent)()
+                pruned_at = time.monotonic()
+
+            if not sent:
+                await asyncio.sleep(poll_interval)
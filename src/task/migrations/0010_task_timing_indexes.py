@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-17 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0009_task_user_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'started_at', 'finished_at'], name='task_user_timing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'finished_at'], name='task_user_finished_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-17 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0010_task_timing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanningJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='queued', max_length=15)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(default=None, null=True)),
+                ('finished_at', models.DateTimeField(default=None, null=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='planning_jobs', to='task.task')),
+            ],
+            options={
+                'db_table': 'planning_job',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['state', 'id'], name='planning_job_state_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='planning',
+            field=models.CharField(blank=True, choices=[('', ''), ('queued', 'queued'), ('unscheduled', 'unscheduled')], default='', max_length=15),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.7 on 2026-10-17 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_status_intervals(apps, schema_editor):
+    Status = apps.get_model("task", "Status")
+    Task = apps.get_model("task", "Task")
+    TaskHistory = apps.get_model("task", "TaskHistory")
+    TaskStatusInterval = apps.get_model("task", "TaskStatusInterval")
+
+    status_ids = {}
+    for status_id, name in Status.objects.order_by("-id").values_list("id", "name"):
+        status_ids[name] = status_id
+
+    history_by_task = {}
+    for task_id, created_at, old_value, new_value in (
+        TaskHistory.objects
+        .filter(field="Статус")
+        .order_by("task_id", "created_at", "id")
+        .values_list("task_id", "created_at", "old_value", "new_value")
+        .iterator()
+    ):
+        history_by_task.setdefault(task_id, []).append((created_at, old_value, new_value))
+
+    batch = []
+    for task_id, created_at, status_id in Task.objects.values_list("id", "created_at", "status_id").iterator():
+        history = history_by_task.get(task_id, [])
+        current = status_ids.get(history[0][1]) if history else status_id
+        entered_at = created_at
+        for changed_at, _, new_value in history:
+            batch.append(TaskStatusInterval(task_id=task_id, status_id=current, entered_at=entered_at, left_at=changed_at))
+            entered_at = changed_at
+            current = status_ids.get(new_value)
+        batch.append(TaskStatusInterval(task_id=task_id, status_id=current, entered_at=entered_at, left_at=None))
+
+        if len(batch) >= 1000:
+            TaskStatusInterval.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        TaskStatusInterval.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0011_planningjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entered_at', models.DateTimeField()),
+                ('left_at', models.DateTimeField(default=None, null=True)),
+                ('status', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='task.status')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_intervals', to='task.task')),
+            ],
+            options={
+                'db_table': 'task_status_interval',
+                'ordering': ['entered_at', 'id'],
+                'indexes': [models.Index(fields=['task', 'entered_at'], name='task_status_interval_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_status_intervals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.15 on 2026-10-17 17:37
+
+import logging
+
+import django.contrib.postgres.fields.ranges
+import task.models
+from django.conf import settings
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+logger = logging.getLogger(__name__)
+
+
+def clear_overlapping_timings(apps, schema_editor):
+    """
+    Task edits were not checked for overlaps before, so existing rows may
+    break task_no_overlap. Of overlapping tasks, the one starting later
+    loses its times.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    Task = apps.get_model("task", "Task")
+    rows = (
+        Task.objects.using(schema_editor.connection.alias)
+        .filter(started_at__isnull=False, finished_at__isnull=False, started_at__lt=models.F("finished_at"))
+        .order_by("user_id", "started_at", "id")
+        .values_list("id", "user_id", "started_at", "finished_at")
+        .iterator()
+    )
+    cleared = []
+    user_id = busy_until = None
+    for task_id, owner_id, started_at, finished_at in rows:
+        if owner_id != user_id:
+            user_id, busy_until = owner_id, finished_at
+        elif started_at < busy_until:
+            cleared.append(task_id)
+        else:
+            busy_until = finished_at
+
+    for i in range(0, len(cleared), 1000):
+        Task.objects.using(schema_editor.connection.alias).filter(id__in=cleared[i:i + 1000]).update(
+            started_at=None,
+            finished_at=None,
+        )
+    if cleared:
+        logger.warning("task_no_overlap: cleared the times of %s overlapping tasks: %s", len(cleared), cleared)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_initial'),
+        ('task', '0013_taskoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_overlapping_timings, migrations.RunPython.noop),
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=task.models.PostgresExclusionConstraint(condition=models.Q(('finished_at__isnull', False), ('started_at__isnull', False), ('started_at__lte', models.F('finished_at'))), expressions=[('user', '='), (models.Func(models.F('started_at'), models.F('finished_at'), function='tstzrange', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), '&&')], name='task_no_overlap'),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import F, Func, Q
 from common.models import Category
 from domain.enums.status_type import StatusType
 from user.models import User
@@ -56,7 +59,56 @@ class Subtask(models.Model):
         ordering = ["id"]
 
 
+class TaskQuerySet(models.QuerySet):
+    def timed(self):
+        return self.filter(started_at__isnull=False, finished_at__isnull=False)
+
+    def overlapping(self, started_at, finished_at):
+        """
+        Tasks whose [started_at, finished_at) interval intersects the given one.
+        On PostgreSQL the check is written as a tstzrange && so it can use the
+        GiST index behind the task_no_overlap exclusion constraint.
+        """
+        qs = self.timed()
+        if connections[qs.db].vendor == "postgresql":
+            from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+
+            return qs.filter(started_at__lte=F("finished_at")).annotate(
+                timing=Func(F("started_at"), F("finished_at"), function="tstzrange", output_field=DateTimeRangeField()),
+            ).filter(timing__overlap=DateTimeTZRange(started_at, finished_at))
+
+        return qs.filter(started_at__lt=finished_at, finished_at__gt=started_at)
+
+
+class PostgresExclusionConstraint(ExclusionConstraint):
+    """
+    ExclusionConstraint that is only created and validated on PostgreSQL,
+    SQLite (local development) has no EXCLUDE.
+    """
+
+    @staticmethod
+    def _supported(connection) -> bool:
+        return connection.vendor == "postgresql"
+
+    def constraint_sql(self, model, schema_editor):
+        return super().constraint_sql(model, schema_editor) if self._supported(schema_editor.connection) else None
+
+    def create_sql(self, model, schema_editor):
+        return super().create_sql(model, schema_editor) if self._supported(schema_editor.connection) else None
+
+    def remove_sql(self, model, schema_editor):
+        return super().remove_sql(model, schema_editor) if self._supported(schema_editor.connection) else None
+
+    def validate(self, model, instance, exclude=None, using=DEFAULT_DB_ALIAS):
+        if self._supported(connections[using]):
+            super().validate(model, instance, exclude=exclude, using=using)
+
+
 class Task(models.Model):
+    PLANNING_QUEUED = "queued"
+    PLANNING_UNSCHEDULED = "unscheduled"
+    PLANNING_STATES = [("", ""), (PLANNING_QUEUED, PLANNING_QUEUED), (PLANNING_UNSCHEDULED, PLANNING_UNSCHEDULED)]
+
     user = models.ForeignKey(to=User, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     description = models.TextField(default="")
@@ -68,10 +120,43 @@ class Task(models.Model):
     sprint = models.ForeignKey(to=Sprint, on_delete=models.SET_NULL, null=True, default=None)
     tags = models.ManyToManyField(to=Tag)
     category = models.ForeignKey(to=Category, on_delete=models.SET_NULL, null=True)
+    # Advanced by the task relay for every broadcast, see task.relay
+    version = models.PositiveIntegerField(default=0)
+    # AI scheduling: waiting for the planning worker, or given up on without a slot
+    planning = models.CharField(max_length=15, choices=PLANNING_STATES, blank=True, default="")
+
+    objects = TaskQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Never write a stale in-memory version back over the relay's counter.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != "version"
+            ]
+        super().save(*args, **kwargs)
 
     class Meta:
         db_table = "task"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "status", "-created_at", "-id"], name="task_user_status_created_idx"),
+            models.Index(fields=["user", "started_at", "finished_at"], name="task_user_timing_idx"),
+            models.Index(fields=["user", "finished_at"], name="task_user_finished_idx"),
+        ]
+        constraints = [
+            # No two timed tasks of one user overlap (needs btree_gist for user_id WITH =)
+            PostgresExclusionConstraint(
+                name="task_no_overlap",
+                expressions=[
+                    ("user", RangeOperators.EQUAL),
+                    (
+                        Func(F("started_at"), F("finished_at"), function="tstzrange", output_field=DateTimeRangeField()),
+                        RangeOperators.OVERLAPS,
+                    ),
+                ],
+                condition=Q(started_at__isnull=False, finished_at__isnull=False, started_at__lte=F("finished_at")),
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -96,3 +181,83 @@ class TaskHistory(models.Model):
     class Meta:
         db_table = "task_history"
         ordering = ["-created_at"]
+
+
+class TaskStatusIntervalQuerySet(models.QuerySet):
+    def transition(self, task_id: int, status_id: int | None, at):
+        """
+        Close the task's open interval at `at` and open a new one for status_id.
+        """
+        with transaction.atomic(using=self.db):
+            self.filter(task_id=task_id, left_at__isnull=True).update(left_at=at)
+            return self.create(task_id=task_id, status_id=status_id, entered_at=at)
+
+
+class TaskStatusInterval(models.Model):
+    """
+    Projection of a task's status history: one row per stay in a status,
+    left_at is NULL for the current one. Written together with status changes.
+    """
+    task = models.ForeignKey(to=Task, on_delete=models.CASCADE, related_name='status_intervals')
+    status = models.ForeignKey(to=Status, on_delete=models.SET_NULL, null=True)
+    entered_at = models.DateTimeField()
+    left_at = models.DateTimeField(null=True, default=None)
+
+    objects = TaskStatusIntervalQuerySet.as_manager()
+
+    class Meta:
+        db_table = "task_status_interval"
+        ordering = ["entered_at", "id"]
+        indexes = [
+            models.Index(fields=["task", "entered_at"], name="task_status_interval_idx"),
+        ]
+
+
+class PlanningJob(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATES = [(QUEUED, QUEUED), (RUNNING, RUNNING), (DONE, DONE), (FAILED, FAILED)]
+
+    task = models.ForeignKey(to=Task, on_delete=models.CASCADE, related_name='planning_jobs')
+    state = models.CharField(max_length=15, choices=STATES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, default=None)
+    finished_at = models.DateTimeField(null=True, default=None)
+
+    class Meta:
+        db_table = "planning_job"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["state", "id"], name="planning_job_state_idx"),
+        ]
+
+
+class TaskOutbox(models.Model):
+    """
+    Task change events written in the same transaction as the change itself
+    and delivered to the user_{id} channel group by the run_task_relay command.
+    """
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE, related_name='+')
+    task_id = models.BigIntegerField()
+    action = models.CharField(max_length=15)
+    # Changed TaskRetrieveDTO fields, "*" for all scalar ones
+    fields = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, default=None)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # The task's version was advanced for this event, a retry does not do it again
+    versioned = models.BooleanField(default=False)
+    # Number the event got in the user's task event stream, a retry sends it again under it
+    seq = models.PositiveBigIntegerField(null=True, default=None)
+
+    class Meta:
+        db_table = "task_outbox"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["id"], condition=Q(sent_at__isnull=True), name="task_outbox_pending_idx"),
+            models.Index(fields=["sent_at"], name="task_outbox_sent_idx"),
+        ]
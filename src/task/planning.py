@@ -0,0 +1,200 @@
+import logging
+
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from infrastructure.ai.openrouter_planner import TaskInput as PlannerTaskInput, TimeSlot as PlannerTimeSlot, analyze_task
+from infrastructure.scheduling.free_time import free_time_engine
+from infrastructure.scheduling.planner import find_best_slot
+from task.formatting import format_dt, history_text, to_aware, to_naive
+from task.models import PlanningJob, Subtask, Task, TaskHistory
+from task.broadcasts import queue_task_update
+from task.signals import send_task_update
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+STALE_AFTER = timedelta(minutes=10)
+
+
+def claim_next_job() -> PlanningJob | None:
+    """
+    Move the oldest queued job to running. The conditional update makes the
+    claim safe with several workers on any database backend.
+    """
+    candidate_ids = list(
+        PlanningJob.objects.filter(state=PlanningJob.QUEUED).order_by("id").values_list("id", flat=True)[:10]
+    )
+    for job_id in candidate_ids:
+        claimed = PlanningJob.objects.filter(id=job_id, state=PlanningJob.QUEUED).update(
+            state=PlanningJob.RUNNING,
+            claimed_at=timezone.now(),
+        )
+        if claimed:
+            return PlanningJob.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs() -> int:
+    return PlanningJob.objects.filter(
+        state=PlanningJob.RUNNING,
+        claimed_at__lt=timezone.now() - STALE_AFTER,
+    ).update(state=PlanningJob.QUEUED, claimed_at=None)
+
+
+def _apply_plan(task: Task, ai_result, user_id: int):
+    scheduling = ai_result.scheduling if ai_result else None
+    message = scheduling.message if scheduling else "Не удалось запланировать"
+    history = []
+
+    with transaction.atomic():
+        # The AI call takes seconds; the user may have scheduled the task by hand meanwhile
+        task = Task.objects.select_for_update().get(id=task.id)
+        if task.planning != Task.PLANNING_QUEUED or task.started_at is not None:
+            return
+
+        scheduled = False
+        if scheduling and scheduling.is_scheduled and scheduling.slot:
+            started_at = to_aware(scheduling.slot.start)
+            finished_at = to_aware(scheduling.slot.end)
+            taken = (
+                Task.objects
+                .filter(user_id=task.user_id)
+                .exclude(id=task.id)
+                .overlapping(started_at, finished_at)
+                .exists()
+            )
+            if taken:
+                message = "Выбранное время уже занято"
+            else:
+                task.started_at = started_at
+                task.finished_at = finished_at
+                scheduled = True
+
+        history.append(TaskHistory(
+            task_id=task.id,
+            user_id=user_id,
+            field="Планирование (AI)",
+            old_value="—",
+            new_value=f"{format_dt(task.started_at)} → {format_dt(task.finished_at)}" if scheduled else message,
+        ))
+
+        ai_actions = []
+        if ai_result and ai_result.actions and not task.subtasks.exists():
+            seen = set()
+            for a in ai_result.actions:
+                name = str(a).strip()
+                if not name or name.casefold() in seen:
+                    continue
+                seen.add(name.casefold())
+                ai_actions.append(name[:127])
+
+        if ai_actions:
+            Subtask.objects.bulk_create([
+                Subtask(name=name, completed=False, task_id=task.id)
+                for name in ai_actions
+            ])
+            history.append(TaskHistory(
+                task_id=task.id,
+                user_id=user_id,
+                field="Подзадачи (AI)",
+                old_value="—",
+                new_value=history_text(", ".join(ai_actions)),
+            ))
+
+        TaskHistory.objects.bulk_create(history)
+
+        # post_save pushes the planned task, or that it stays unscheduled, to the user's socket group
+        if scheduled:
+            task.planning = ""
+            task.save(update_fields=["started_at", "finished_at", "planning"])
+        else:
+            task.planning = Task.PLANNING_UNSCHEDULED
+            task.save(update_fields=["planning"])
+        if ai_actions:
+            # bulk_create sends no signals
+            send_task_update(task, action="update", fields=("subtasks",))
+
+
+def _give_up(task_id: int):
+    with transaction.atomic():
+        updated = Task.objects.filter(id=task_id, planning=Task.PLANNING_QUEUED).update(
+            planning=Task.PLANNING_UNSCHEDULED,
+        )
+        if updated:
+            queue_task_update(task_id, action="update", fields=("planning",))
+
+
+async def plan_task(task_id: int):
+    task = await Task.objects.select_related("user").prefetch_related("tags").aget(id=task_id)
+    if task.started_at is not None:
+        # Scheduled by hand while the job was waiting in the queue.
+        return
+
+    user = task.user
+    now = timezone.now()
+    ai_result = None
+    if task.deadline_at and task.deadline_at > now:
+        wake = user.wake_up_time
+        bed = user.bed_time
+        wake_up_time = wake.strftime("%H:%M") if wake else "08:00"
+        bed_time = bed.strftime("%H:%M") if bed else "23:00"
+
+        # Reloaded whenever the user's data version moves, whichever process wrote
+        slots = await sync_to_async(free_time_engine.free_slots)(
+            user.id,
+            now,
+            task.deadline_at,
+            wake_up_time=wake,
+            bed_time=bed,
+        )
+        free_slots = [PlannerTimeSlot(start=to_naive(s), end=to_naive(e)) for s, e in slots]
+
+        planner_task = PlannerTaskInput(
+            title=task.name,
+            description=task.description or "",
+            tags=sorted(t.name for t in task.tags.all()),
+            wake_up_time=wake_up_time,
+            bed_time=bed_time,
+        )
+
+        try:
+            ai_result = await analyze_task(planner_task)
+        except Exception:
+            logger.exception("AI planning error task_id=%s", task_id)
+            ai_result = None
+
+        if ai_result:
+            ai_result.scheduling = find_best_slot(
+                free_slots=free_slots,
+                duration_minutes=ai_result.recommended_block_minutes,
+                concentration_level=ai_result.concentration_level,
+                wake_up_time=wake_up_time,
+                bed_time=bed_time,
+                deadline=to_naive(task.deadline_at),
+                now=to_naive(now),
+            )
+
+    await sync_to_async(_apply_plan)(task, ai_result, user.id)
+
+
+async def run_job(job: PlanningJob):
+    job.attempts += 1
+    try:
+        await plan_task(job.task_id)
+    except Task.DoesNotExist:
+        job.state = PlanningJob.DONE
+    except Exception as exc:
+        logger.exception("Planning job failed job_id=%s attempt=%s", job.id, job.attempts)
+        job.error = str(exc)
+        job.state = PlanningJob.QUEUED if job.attempts < MAX_ATTEMPTS else PlanningJob.FAILED
+        if job.state == PlanningJob.FAILED:
+            await sync_to_async(_give_up)(job.task_id)
+    else:
+        job.state = PlanningJob.DONE
+    job.finished_at = timezone.now() if job.state != PlanningJob.QUEUED else None
+    await job.asave(update_fields=["state", "attempts", "error", "finished_at"])
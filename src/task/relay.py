@@ -0,0 +1,155 @@
+import logging
+
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from infrastructure.comon.cache_versions import bump_version, data_version
+from task.broadcasts import SCALAR_FIELDS, build_task_payloads
+from task.event_stream import task_event_stream
+from task.models import Task, TaskOutbox
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 20
+SENT_RETENTION = timedelta(hours=1)
+
+
+def fetch_pending(limit: int = BATCH_SIZE) -> list[TaskOutbox]:
+    return list(TaskOutbox.objects.filter(sent_at__isnull=True).order_by("id")[:limit])
+
+
+def mark_sent(ids: list[int]):
+    if ids:
+        TaskOutbox.objects.filter(id__in=ids).update(sent_at=timezone.now())
+
+
+def mark_failed(ids: list[int]):
+    if not ids:
+        return
+    TaskOutbox.objects.filter(id__in=ids).update(attempts=F("attempts") + 1)
+    dropped = TaskOutbox.objects.filter(id__in=ids, attempts__gte=MAX_ATTEMPTS).update(sent_at=timezone.now())
+    if dropped:
+        logger.error("Dropped %s task events after %s attempts", dropped, MAX_ATTEMPTS)
+
+
+def record_seq(event_id: int, seq: int):
+    TaskOutbox.objects.filter(id=event_id).update(seq=seq)
+
+
+def prune_sent() -> int:
+    deleted, _ = TaskOutbox.objects.filter(sent_at__lt=timezone.now() - SENT_RETENTION).delete()
+    return deleted
+
+
+@transaction.atomic
+def bump_versions(events: list[TaskOutbox]) -> None:
+    """
+    Advance the version of the events' tasks once per event, so a retried
+    event is sent with the version it got the first time. The version is
+    part of what users read, so their data version moves with it.
+    """
+    fresh = [event for event in events if not event.versioned]
+    if not fresh:
+        return
+    Task.objects.filter(id__in={event.task_id for event in fresh}).update(version=F("version") + 1)
+    TaskOutbox.objects.filter(id__in=[event.id for event in fresh]).update(versioned=True)
+    for user_id in {event.user_id for event in fresh}:
+        bump_version(data_version(user_id))
+
+
+def _collapse(events: list[TaskOutbox]) -> list[tuple[TaskOutbox, str, set]]:
+    """
+    Keep the last event per task (payloads carry the current state anyway),
+    with the union of changed fields and "create" if any of them was one.
+    """
+    last = {}
+    created = set()
+    fields = {}
+    for event in events:
+        last[event.task_id] = event
+        if event.action == "create":
+            created.add(event.task_id)
+        fields.setdefault(event.task_id, set()).update(event.fields or ("*",))
+    return [
+        (event, "create" if event.task_id in created else event.action, fields[event.task_id])
+        for event in events
+        if last[event.task_id] is event
+    ]
+
+
+def task_message(task: dict, action: str, fields: set) -> dict:
+    """
+    Creates carry the full snapshot. Updates carry only the changed fields and
+    the version they apply on top of; a client whose copy is older asks the
+    consumer for a snapshot instead.
+    """
+    if action == "create":
+        return {"type": "task_update", "action": action, "task": task}
+
+    names = set(SCALAR_FIELDS) | (fields - {"*"}) if "*" in fields else fields
+    return {
+        "type": "task_update",
+        "action": action,
+        "task_id": task["id"],
+        "version": task["version"],
+        "base_version": task["version"] - 1,
+        "changes": {name: task[name] for name in sorted(names) if name in task},
+    }
+
+
+async def relay_batch(channel_layer) -> tuple[int, int]:
+    """
+    Deliver one batch of pending events. Events of one user are sent in id
+    order; when a send fails, the rest of that user's events stay pending so
+    the order is kept on retry. An event is added to the replay stream once;
+    a retry only sends it again under the number it got. Returns (sent, failed).
+    """
+    events = await sync_to_async(fetch_pending)()
+    if not events:
+        return 0, 0
+
+    task_ids = {event.task_id for event in events}
+    await sync_to_async(bump_versions)(events)
+    payloads = await sync_to_async(build_task_payloads)(task_ids)
+
+    by_user: dict[int, list[TaskOutbox]] = {}
+    for event in events:
+        by_user.setdefault(event.user_id, []).append(event)
+
+    sent, failed = [], []
+    for user_id, user_events in by_user.items():
+        delivered = set()
+        try:
+            for event, action, fields in _collapse(user_events):
+                task = payloads.get(event.task_id)
+                if task is not None:
+                    message = task_message(task, action, fields)
+                    if event.seq is None:
+                        # Numbered and kept for replay to sockets that reconnect later
+                        event.seq = await task_event_stream.publish(user_id, message)
+                        await sync_to_async(record_seq)(event.id, event.seq)
+                    else:
+                        # Stored by an earlier attempt whose send failed
+                        message["seq"] = event.seq
+                    await channel_layer.group_send(
+                        f"user_{user_id}",
+                        {
+                            "type": "task_update",
+                            "message": message,
+                        },
+                    )
+                delivered.add(event.task_id)
+        except Exception:
+            logger.exception("Task relay: send failed for user_id=%s", user_id)
+        for event in user_events:
+            (sent if event.task_id in delivered else failed).append(event.id)
+
+    await sync_to_async(mark_sent)(sent)
+    await sync_to_async(mark_failed)(failed)
+    return len(sent), len(failed)
@@ -1,57 +1,63 @@
 from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.db import transaction
 from django.dispatch import receiver
-from .models import Task, Subtask
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from domain.schemas.task.main import TaskRetrieveDTO
+from .models import Comment, Status, Tag, Task, Subtask
+from .broadcasts import queue_task_update
+from .status_registry import status_registry
+from infrastructure.comon.cache_versions import STATUS_VERSION, bump_version, data_version, reference_version
 
-def send_task_update(task_instance, action="update"):
-    if not task_instance or not task_instance.user:
+def send_task_update(task_instance, action="update", fields=("*",)):
+    if not task_instance or not task_instance.user_id:
         return
 
-    channel_layer = get_channel_layer()
-    
-    try:
-        # Pydantic's from_attributes works with ORM objects, but accessing related fields (M2M) 
-        # triggers queries. Since signals are sync, this is fine.
-        task_data = TaskRetrieveDTO.model_validate(task_instance).model_dump(mode='json')
-        
-        message = {
-            "type": "task_update",
-            "action": action,
-            "task": task_data
-        }
-
-        print(f"Sending WS update for user {task_instance.user.id}: {action}") # LOGGING
-
-        async_to_sync(channel_layer.group_send)(
-            f"user_{task_instance.user.id}",
-            {
-                "type": "task_update",
-                "message": message
-            }
-        )
-    except Exception as e:
-        print(f"Error sending websocket update: {e}")
+    # Written to the outbox and relayed by run_task_relay, see task.broadcasts
+    queue_task_update(task_instance.id, action, task_instance.user_id, fields)
+
+def _changed_fields(update_fields):
+    if not update_fields:
+        return ("*",)
+    # update_fields may use attnames ("status_id"), the broadcast uses field names
+    return tuple(Task._meta.get_field(name).name for name in update_fields)
 
 @receiver(post_save, sender=Task)
 def task_post_save(sender, instance, created, **kwargs):
-    send_task_update(instance, action="create" if created else "update")
+    send_task_update(instance, action="create" if created else "update", fields=_changed_fields(kwargs.get("update_fields")))
+
+@receiver(post_delete, sender=Task)
+def task_post_delete(sender, instance, **kwargs):
+    if instance.user_id:
+        bump_version(data_version(instance.user_id))
 
 @receiver(m2m_changed, sender=Task.tags.through)
 def task_tags_changed(sender, instance, action, **kwargs):
     # Only trigger on post actions to ensure data is in DB
-    if action.startswith("post_"):
-        send_task_update(instance, action="update")
+    if action.startswith("post_") and isinstance(instance, Task):
+        send_task_update(instance, action="update", fields=("tags",))
 
 @receiver(post_save, sender=Subtask)
 def subtask_post_save(sender, instance, created, **kwargs):
     # When a subtask is updated/created, update the parent task
-    if instance.task:
-        send_task_update(instance.task, action="update")
+    queue_task_update(instance.task_id, action="update", fields=("subtasks",))
 
 @receiver(post_delete, sender=Subtask)
 def subtask_post_delete(sender, instance, **kwargs):
-    if instance.task:
-        send_task_update(instance.task, action="update")
-
+    queue_task_update(instance.task_id, action="update", fields=("subtasks",))
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    if instance.user_id:
+        bump_version(reference_version(instance.user_id))
+        bump_version(data_version(instance.user_id))
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+def status_changed(sender, instance, **kwargs):
+    # Other processes notice the new version, this one drops its copy right away
+    bump_version(STATUS_VERSION)
+    transaction.on_commit(status_registry.invalidate)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump_version(data_version(instance.user_id))
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+from infrastructure.comon.cache_versions import STATUS_VERSION, aget_versions, get_versions
+
+
+STATUS_CHECK_SECONDS = 5
+
+
+class StatusRegistry:
+    """
+    Process-wide copy of the status table, in id order. It is reloaded when
+    the status version moves (see task.signals): at once in the process that
+    changed a status, within check_seconds in the others. An id it does not
+    know forces a reload, so statuses created elsewhere are found right away.
+
+    Instances are shared between requests: read them, never modify or save
+    them.
+    """
+
+    def __init__(self, check_seconds: float = STATUS_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self._statuses: dict | None = None
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load() -> dict:
+        from task.models import Status
+
+        return {status.id: status for status in Status.objects.order_by("id")}
+
+    def _current(self) -> dict | None:
+        with self._lock:
+            if self._statuses is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._statuses
+        return None
+
+    def _confirm(self, version: int | None) -> dict | None:
+        with self._lock:
+            if self._statuses is not None and version is not None and version == self._version:
+                self._checked_at = time.monotonic()
+                return self._statuses
+        return None
+
+    def _store(self, statuses: dict, version: int | None) -> dict:
+        with self._lock:
+            self._statuses = statuses
+            self._version = version
+            self._checked_at = time.monotonic()
+        return statuses
+
+    def mapping(self, reload: bool = False) -> dict:
+        """
+        { status_id: Status }
+        """
+        statuses = None if reload else self._current()
+        if statuses is not None:
+            return statuses
+        versions = get_versions(STATUS_VERSION)
+        version = versions[0] if versions else None
+        statuses = None if reload else self._confirm(version)
+        if statuses is not None:
+            return statuses
+        return self._store(self._load(), version)
+
+    async def amapping(self, reload: bool = False) -> dict:
+        statuses = None if reload else self._current()
+        if statuses is not None:
+            return statuses
+        versions = await aget_versions(STATUS_VERSION)
+        version = versions[0] if versions else None
+        statuses = None if reload else self._confirm(version)
+        if statuses is not None:
+            return statuses
+        return self._store(await sync_to_async(self._load)(), version)
+
+    def get(self, status_id: int | None):
+        if status_id is None:
+            return None
+        status = self.mapping().get(status_id)
+        if status is None:
+            status = self.mapping(reload=True).get(status_id)
+        return status
+
+    async def aget(self, status_id: int | None):
+        if status_id is None:
+            return None
+        status = (await self.amapping()).get(status_id)
+        if status is None:
+            status = (await self.amapping(reload=True)).get(status_id)
+        return status
+
+    def default(self):
+        """
+        Status of a task created without one: the first by id.
+        """
+        return next(iter(self.mapping().values()), None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._statuses = None
+
+
+status_registry = StatusRegistry()
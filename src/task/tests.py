@@ -0,0 +1,358 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from common.models import Category
+from domain.schemas.task.main import TaskCreateDTO
+from infrastructure.ai.openrouter_planner import CognitiveAnalysisResult
+from infrastructure.comon.cache_versions import KEY_PREFIX, data_version
+from task.broadcasts import queue_task_update
+from task.event_stream import LocalTaskEventStream
+from task.models import Status, Subtask, Tag, Task, TaskHistory, TaskOutbox, TaskStatusInterval
+from task.planning import plan_task
+from task.relay import relay_batch
+from task.status_registry import status_registry
+from task.views.analytics import AnalyticsAsyncViewSet
+from task.views.main import TaskAsyncViewSet
+from user.models import User
+
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TaskQueryTestCase(TestCase):
+    """
+    A user with a few statuses and categories. status_registry is warmed
+    before every test, as it is in a running process.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="owner", password="secret")
+        cls.new = Status.objects.create(name="Новая", type="new", color="#aaa")
+        cls.in_work = Status.objects.create(name="В работе", type="in work", color="#bbb")
+        cls.completed = Status.objects.create(name="Готово", type="completed", color="#ccc")
+        cls.work = Category.objects.create(name="Работа", user=cls.user)
+        cls.home = Category.objects.create(name="Дом", user=cls.user)
+
+    def setUp(self):
+        status_registry.invalidate()
+        status_registry.mapping()
+
+    def create_task(self, name, status, category=None, **fields):
+        task = Task.objects.create(user=self.user, name=name, status=status, category=category, **fields)
+        TaskStatusInterval.objects.create(task=task, status=status, entered_at=task.created_at)
+        return task
+
+
+class CanbanBoardTests(TaskQueryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user)
+        created_at = timezone.now() - timedelta(days=1)
+        self.new_tasks = [self.create_task(f"Новая {i}", self.new) for i in range(3)]
+        # Same created_at, so pages are split on the id
+        Task.objects.filter(id__in=[task.id for task in self.new_tasks]).update(created_at=created_at)
+        self.done = self.create_task("Готово", self.completed)
+        other = User.objects.create_user(username="other", password="secret")
+        Task.objects.create(user=other, name="Чужая", status=self.new)
+
+    async def get(self, **params):
+        # Body read in the loop that ran the view, as under ASGI
+        response = await self.async_client.get("/task/canban/", params)
+        body = b"".join([part async for part in response]) if response.streaming else response.content
+        return response.status_code, json.loads(body)
+
+    async def test_first_page_of_every_column(self):
+        code, columns = await self.get(limit=2)
+
+        self.assertEqual(code, 200)
+        self.assertEqual(
+            [(column["id"], column["total"], [task["id"] for task in column["tasks"]]) for column in columns],
+            [
+                (self.new.id, 3, [self.new_tasks[2].id, self.new_tasks[1].id]),
+                (self.in_work.id, 0, []),
+                (self.completed.id, 1, [self.done.id]),
+            ],
+        )
+        self.assertIsNotNone(columns[0]["next_cursor"])
+        self.assertIsNone(columns[1]["next_cursor"])
+        self.assertIsNone(columns[2]["next_cursor"])
+
+    async def test_cursor_continues_column(self):
+        _, columns = await self.get(limit=2)
+
+        code, page = await self.get(status_id=self.new.id, cursor=columns[0]["next_cursor"], limit=2)
+
+        self.assertEqual(code, 200)
+        self.assertEqual(page["id"], self.new.id)
+        self.assertEqual([task["id"] for task in page["tasks"]], [self.new_tasks[0].id])
+        self.assertIsNone(page["next_cursor"])
+
+    async def test_bad_cursor(self):
+        code, body = await self.get(status_id=self.new.id, cursor="не курсор")
+
+        self.assertEqual(code, 400)
+        self.assertEqual(body, {"detail": "Некорректный курсор"})
+
+
+async def _failing_rows(*args, **kwargs):
+    raise DatabaseError("query failed")
+    yield
+
+
+class StreamedReadFailureTests(TaskQueryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_error_raised_before_response(self):
+        for url in ("/task/canban/", "/task/calendar/"):
+            with self.subTest(url=url), mock.patch.object(QuerySet, "aiterator", _failing_rows):
+                with self.assertRaises(DatabaseError):
+                    self.client.get(url)
+
+
+class AnalyticsStatsQueryTests(TaskQueryTestCase):
+    def test_query_count_does_not_grow_with_tasks(self):
+        for i in range(3):
+            self.create_task(f"Новая {i}", self.new, self.work)
+        for i in range(4):
+            self.create_task(f"В работе {i}", self.in_work, self.home)
+        self.create_task("Готово", self.completed, finished_at=timezone.now() + timedelta(hours=1))
+
+        with self.assertNumQueries(2):
+            stats = AnalyticsAsyncViewSet._collect_stats(self.user)
+
+        self.assertEqual(stats["kpi"], {"total": 8, "completed": 1, "completion_rate": 12.5})
+        self.assertEqual(
+            stats["categories"],
+            [
+                {"category__name": "Дом", "count": 4},
+                {"category__name": "Работа", "count": 3},
+                {"category__name": "Без категории", "count": 1},
+            ],
+        )
+        self.assertEqual(sum(day["count"] for day in stats["daily"]), 8)
+        self.assertEqual({row["status"] for row in stats["lifecycle"]}, {"Новая", "В работе", "Готово"})
+
+    def test_user_without_tasks(self):
+        with self.assertNumQueries(2):
+            stats = AnalyticsAsyncViewSet._collect_stats(self.user)
+
+        self.assertEqual(stats["kpi"], {"total": 0, "completed": 0, "completion_rate": 0})
+        self.assertEqual(stats["lifecycle"], [])
+
+
+class TaskLifecycleTests(TaskQueryTestCase):
+    def test_intervals(self):
+        task = self.create_task("Задача", self.new)
+        TaskStatusInterval.objects.transition(task.id, self.in_work.id, task.created_at + timedelta(minutes=5))
+
+        segments, _ = async_to_sync(TaskAsyncViewSet()._calculate_lifecycle)(task)
+
+        self.assertEqual([segment.status for segment in segments], ["Новая", "В работе"])
+        self.assertEqual(segments[0].duration_seconds, 300)
+
+    def test_task_without_intervals_is_in_current_status(self):
+        task = Task.objects.create(user=self.user, name="Задача", status=self.in_work)
+
+        segments, _ = async_to_sync(TaskAsyncViewSet()._calculate_lifecycle)(task)
+
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(segments[0].status, "В работе")
+        self.assertEqual(segments[0].start, task.created_at)
+        self.assertEqual(segments[0].percent, 100)
+
+
+class QueueTaskUpdateTests(TaskQueryTestCase):
+    def setUp(self):
+        super().setUp()
+        # Without signals, so the transaction has not seen a change yet
+        [self.task] = Task.objects.bulk_create([Task(user=self.user, name="Задача", status=self.new)])
+
+    def events(self):
+        return list(TaskOutbox.objects.values_list("task_id", "fields"))
+
+    def test_repeated_changes_get_a_closing_event(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_task_update(self.task.id, fields=("name",))
+            queue_task_update(self.task.id, fields=("description",))
+
+        self.assertEqual(self.events(), [(self.task.id, ["name"]), (self.task.id, ["description", "name"])])
+
+    def test_rolled_back_changes_are_forgotten(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    queue_task_update(self.task.id, fields=("name",))
+                    raise RuntimeError
+            queue_task_update(self.task.id, fields=("description",))
+
+        self.assertEqual(self.events(), [(self.task.id, ["description"])])
+
+
+class FakeChannelLayer:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent = []
+
+    async def group_send(self, group, message):
+        if self.fail:
+            raise ConnectionError("channel layer is down")
+        self.sent.append((group, message["message"]))
+
+
+class RelayTests(TaskQueryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stream = LocalTaskEventStream()
+        patcher = mock.patch("task.relay.task_event_stream", self.stream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        [self.task] = Task.objects.bulk_create([Task(user=self.user, name="Задача", status=self.new)])
+        TaskOutbox.objects.create(user=self.user, task_id=self.task.id, action="update", fields=["name"])
+
+    def relay(self, layer):
+        with self.captureOnCommitCallbacks(execute=True):
+            return async_to_sync(relay_batch)(layer)
+
+    def relay_failing(self):
+        with self.assertLogs("task.relay", level="ERROR"):
+            return self.relay(FakeChannelLayer(fail=True))
+
+    def test_retry_does_not_advance_version_again(self):
+        self.assertEqual(self.relay_failing(), (0, 1))
+        layer = FakeChannelLayer()
+        self.assertEqual(self.relay(layer), (1, 0))
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.version, 1)
+        [(group, message)] = layer.sent
+        self.assertEqual(group, f"user_{self.user.id}")
+        self.assertEqual((message["version"], message["changes"]), (1, {"name": "Задача"}))
+
+    def test_data_version_moves_with_task_version(self):
+        key = KEY_PREFIX + data_version(self.user.id)
+        cache.set(key, 1, timeout=None)
+
+        self.relay_failing()
+        self.relay(FakeChannelLayer())
+
+        self.assertEqual(cache.get(key), 2)
+
+    def test_retry_reuses_stream_number(self):
+        self.relay_failing()
+        layer = FakeChannelLayer()
+        self.relay(layer)
+
+        [(_, message)] = layer.sent
+        self.assertEqual(message["seq"], 1)
+        self.assertEqual(async_to_sync(self.stream.head)(self.user.id), 1)
+
+
+class PlanTaskTests(TaskQueryTestCase):
+    def setUp(self):
+        super().setUp()
+        [self.task] = Task.objects.bulk_create([Task(
+            user=self.user, name="Задача", status=self.new,
+            deadline_at=timezone.now() + timedelta(days=2), planning=Task.PLANNING_QUEUED,
+        )])
+        self.manual_start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def analysis(self):
+        return CognitiveAnalysisResult(
+            concentration_level="medium", confidence=0.9, recommended_block_minutes=60,
+            preferred_energy="medium", best_time_of_day="утро", reason="", actions=["Шаг 1", "Шаг 2"],
+        )
+
+    def plan(self, analyze):
+        with mock.patch("task.planning.analyze_task", analyze), self.captureOnCommitCallbacks(execute=True):
+            async_to_sync(plan_task)(self.task.id)
+        self.task.refresh_from_db()
+
+    async def schedule_by_hand(self):
+        await Task.objects.filter(id=self.task.id).aupdate(
+            started_at=self.manual_start, finished_at=self.manual_start + timedelta(hours=1), planning="",
+        )
+
+    def test_plan_is_applied(self):
+        async def analyze(task_input):
+            return self.analysis()
+
+        self.plan(analyze)
+
+        self.assertIsNotNone(self.task.started_at)
+        self.assertEqual(self.task.planning, "")
+        self.assertEqual(self.task.subtasks.count(), 2)
+
+    def test_scheduled_by_hand_during_analysis(self):
+        async def analyze(task_input):
+            await self.schedule_by_hand()
+            return self.analysis()
+
+        self.plan(analyze)
+
+        self.assertEqual((self.task.started_at, self.task.planning), (self.manual_start, ""))
+        self.assertFalse(self.task.subtasks.exists())
+        self.assertFalse(TaskHistory.objects.filter(task_id=self.task.id).exists())
+
+    def test_failed_analysis_keeps_manual_schedule(self):
+        async def analyze(task_input):
+            await self.schedule_by_hand()
+            raise RuntimeError("upstream")
+
+        with self.assertLogs("task.planning", level="ERROR"):
+            self.plan(analyze)
+
+        self.assertEqual((self.task.started_at, self.task.planning), (self.manual_start, ""))
+
+
+class ApplyUpdateQueryTests(TaskQueryTestCase):
+    def test_update_with_tags_and_subtasks(self):
+        start = timezone.now() + timedelta(days=1)
+        tags = Tag.objects.bulk_create([Tag(name=f"Тэг {i}", user=self.user) for i in range(3)])
+        # Without signals, so the update is the first change the transaction sees
+        [task] = Task.objects.bulk_create([Task(
+            user=self.user, name="Задача", status=self.new, category=self.work,
+            started_at=start, finished_at=start + timedelta(hours=1),
+        )])
+        Task.tags.through.objects.bulk_create([Task.tags.through(task=task, tag=tag) for tag in tags[:2]])
+        TaskStatusInterval.objects.create(task=task, status=self.new, entered_at=task.created_at)
+        subtasks = Subtask.objects.bulk_create([Subtask(task=task, name=f"Подзадача {i}") for i in range(2)])
+
+        data = {
+            "name": "Новое имя",
+            "status_id": self.in_work.id,
+            "category_id": self.home.id,
+            "started_at": start,
+            "finished_at": start + timedelta(hours=2),
+            "tags": [tags[1].id, tags[2].id],
+            "subtasks": [{"id": subtasks[0].id, "name": "Переименована"}, {"name": "Новая"}],
+        }
+
+        # Savepoint, task with its tags and subtasks (3), category, tags, overlap check,
+        # task update and its outbox event, tags set (4), subtask update and insert,
+        # status transition (with its savepoint, 4), history, release
+        with self.assertNumQueries(21):
+            async_to_sync(TaskAsyncViewSet._apply_update)(
+                task.id, self.user, data, TaskCreateDTO(**data), data["tags"], data["subtasks"],
+            )
+
+        task.refresh_from_db()
+        self.assertEqual((task.name, task.status_id, task.category_id), ("Новое имя", self.in_work.id, self.home.id))
+        self.assertEqual(set(task.tags.values_list("id", flat=True)), {tags[1].id, tags[2].id})
+        self.assertEqual(
+            sorted(task.subtasks.values_list("name", flat=True)),
+            ["Новая", "Переименована", "Подзадача 1"],
+        )
+        self.assertEqual(TaskOutbox.objects.filter(task_id=task.id).count(), 1)
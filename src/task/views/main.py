@@ -1,27 +1,43 @@
+import base64
 import logging
 
 from datetime import datetime, time, timedelta
 
 from adrf.requests import AsyncRequest
 from adrf.viewsets import ViewSet
-from asgiref.sync import sync_to_async
-from django.db.models import Prefetch
+from django.core.cache import cache
+from django.db.models import Count, Exists, F, Q, Subquery, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 
 from common.models import Category
-from domain.schemas.task.canban import CanbanColumnRetriveDTO
-from domain.schemas.task.common import StatusRetriveDTO, SprintRetriveDTO, TagRetrieveDTO, CategoryRetriveDTO, \
+from domain.schemas.task.canban import CanbanColumnRetriveDTO, CanbanColumnPageRetriveDTO
+from domain.schemas.task.common import StatusRetriveDTO, TagRetrieveDTO, CategoryRetriveDTO, \
     TagCreateDTO, SubtaskBulkCreateDTO, CommentCreateDTO, CommentRetrieveDTO, TaskHistoryRetrieveDTO, SubtaskCompletedUpdateDTO
 from domain.schemas.task.error import TaskCreateErrorDTO
-from domain.schemas.task.main import TaskCreateDTO, TaskRetrieveDTO, TaskStatusUpdateDTO, TaskTimingUpdateDTO, TaskLifecycleSegment
-from infrastructure.ai.openrouter_planner import TaskInput as PlannerTaskInput, TimeSlot as PlannerTimeSlot, analyze_task
+from domain.schemas.task.main import TaskCreateDTO, TaskStatusUpdateDTO, TaskTimingUpdateDTO, TaskLifecycleSegment
 from infrastructure.comon.authetication import AsyncAuthentication
+from infrastructure.comon.cache_versions import STATUS_VERSION, aget_versions, data_version, reference_version
+from infrastructure.comon.conditional import conditional, version_etag
+from infrastructure.comon.db_routing import replica_reads
 from infrastructure.comon.login_decorator import login_required
-from task.models import Status, Sprint, Tag, Task, Subtask, Comment, TaskHistory
+from infrastructure.comon.streaming import STREAM_CHUNK_SIZE, StreamingJSONResponse, json_array, json_object, prefetched
+from infrastructure.comon.unit_of_work import Rejected, unit_of_work
+from task.broadcasts import queue_task_update
+from task.fieldsets import BOARD_CARD, CALENDAR_ENTRY, TASK_DETAIL, TaskFieldset
+from task.formatting import format_dt, history_text, to_aware
+from task.models import Status, Sprint, Tag, Task, Subtask, Comment, TaskHistory, TaskStatusInterval, PlanningJob
+from task.status_registry import status_registry
+from user.models import User
 
 
+CANBAN_PAGE_SIZE = 20
+CANBAN_MAX_PAGE_SIZE = 100
+# Entries are keyed by version, the timeout only drops ones nobody asks for
+REFERENCE_CACHE_SECONDS = 24 * 60 * 60
+
 class TaskAsyncViewSet(ViewSet):
     authentication_classes = [AsyncAuthentication]
 
@@ -43,51 +59,28 @@ class TaskAsyncViewSet(ViewSet):
         return f"{months} мес {days % 30} дн"
 
     async def _calculate_lifecycle(self, task) -> tuple[list[TaskLifecycleSegment], str]:
-        history = TaskHistory.objects.filter(task_id=task.id, field="Статус").order_by("created_at")
-        history_items = [h async for h in history]
-        
-        # Get all statuses for colors
-        statuses = Status.objects.all()
-        status_map = {s.name: s.color async for s in statuses}
-        
+        intervals = TaskStatusInterval.objects.filter(task_id=task.id).order_by("entered_at", "id")
+
         segments = []
-        cursor = task.created_at
-        
-        # Determine initial status
-        current_status = "Новый" # Default fallback
-        if history_items:
-            current_status = history_items[0].old_value
-        elif task.status:
-            current_status = task.status.name
-            
         now = timezone.now()
-        
-        # Iterate history
-        for item in history_items:
-            end = item.created_at
-            duration = end - cursor
-            
+
+        intervals = [interval async for interval in intervals]
+        if not intervals:
+            # No interval rows (e.g. created in the admin): in its current status since creation
+            intervals = [TaskStatusInterval(task_id=task.id, status_id=task.status_id, entered_at=task.created_at)]
+
+        for interval in intervals:
+            end = interval.left_at or now
+            interval_status = await status_registry.aget(interval.status_id)
+            status_name = interval_status.name if interval_status else "Новый"
             segments.append({
-                "status": current_status,
-                "color": status_map.get(current_status, "#e0e0e0"),
-                "duration_delta": duration,
-                "start": cursor,
+                "status": status_name,
+                "color": interval_status.color if interval_status else "#e0e0e0",
+                "duration_delta": end - interval.entered_at,
+                "start": interval.entered_at,
                 "end": end
             })
-            
-            cursor = end
-            current_status = item.new_value
-            
-        # Add final/current segment
-        final_duration = now - cursor
-        segments.append({
-            "status": current_status,
-            "color": status_map.get(current_status, "#e0e0e0"),
-            "duration_delta": final_duration,
-            "start": cursor,
-            "end": now
-        })
-        
+
         # Calculate total and percentages
         total_seconds = sum([s["duration_delta"].total_seconds() for s in segments])
         total_duration_str = self._format_duration(timedelta(seconds=total_seconds))
@@ -109,23 +102,11 @@ class TaskAsyncViewSet(ViewSet):
         return result_segments, total_duration_str
 
     @staticmethod
-    def _history_text(value) -> str:
-        if value is None:
-            return "—"
-        text = str(value)
-        text = text.replace("\n", " ").strip()
-        if len(text) > 180:
-            return text[:180] + "…"
-        return text
-
-    @staticmethod
-    def _format_dt(value) -> str:
-        if value is None:
-            return "—"
-        try:
-            return value.strftime("%d.%m.%Y %H:%M")
-        except Exception:
-            return str(value)
+    def _registered_status(status_id: int) -> Status:
+        status_obj = status_registry.get(status_id)
+        if status_obj is None:
+            raise Status.DoesNotExist("Status matching query does not exist.")
+        return status_obj
 
     async def _add_history(
         self,
@@ -146,37 +127,79 @@ class TaskAsyncViewSet(ViewSet):
         except Exception as exc:
             logging.error(f"Create history error: {exc}")
 
+    @staticmethod
+    def _history(task_id: int, user_id: int | None, field: str, old_value: str = "", new_value: str = "") -> TaskHistory:
+        # Unsaved row for a unit of work to bulk_create
+        return TaskHistory(task_id=task_id, user_id=user_id, field=field, old_value=old_value or "", new_value=new_value or "")
+
+    @staticmethod
+    async def _reference_etag(view, request, *args, **kwargs):
+        versions = await aget_versions(reference_version(request.user.id), STATUS_VERSION)
+        return None if versions is None else version_etag(request.user.id, *versions)
+
+    @staticmethod
+    async def _board_etag(view, request, *args, **kwargs):
+        versions = await aget_versions(data_version(request.user.id), STATUS_VERSION)
+        return None if versions is None else version_etag(request.user.id, *versions)
+
+    @staticmethod
+    async def _calendar_etag(view, request, *args, **kwargs):
+        versions = await aget_versions(data_version(request.user.id))
+        if versions is None:
+            return None
+        # Without week_start the week is the current one, which changes on Mondays
+        week_start = view._week_start_from_iso(request.query_params.get("week_start"))
+        return version_etag(request.user.id, *versions, week_start.date().isoformat())
+
+    @staticmethod
+    async def _task_etag(view, request, *args, **kwargs):
+        versions = await aget_versions(data_version(request.user.id), STATUS_VERSION)
+        if versions is None:
+            return None
+        # The current lifecycle interval grows with time: the body changes every
+        # request, the shown durations only every minute
+        return version_etag(request.user.id, *versions, int(timezone.now().timestamp() // 60), weak=True)
+
+    @staticmethod
+    @unit_of_work(atomic=False)
+    def _load_reference_data(user_id: int) -> dict:
+        tags = Tag.objects.filter(user_id=user_id).order_by("name", "id")
+        categories = Category.objects.filter(user_id=user_id)
+        return {
+            'statuses': [
+                StatusRetriveDTO.model_validate(item).model_dump(mode="json")
+                for item in status_registry.mapping().values()
+            ],
+            'tags': [TagRetrieveDTO.model_validate(item).model_dump(mode="json") for item in tags],
+            'categories': [CategoryRetriveDTO.model_validate(item).model_dump(mode="json") for item in categories],
+        }
+
     @login_required
+    @conditional(_reference_etag)
     async def creation_page_info(
         self,
         request: AsyncRequest,
     ):
+        """
+        Statuses, tags and categories for the task form. Cached under the
+        user's reference version and the status version, which also make
+        up the ETag, so a warm or unchanged form costs no queries.
+        """
         user = request.user
         if not user.is_authenticated:
             return Response(status=status.HTTP_401_UNAUTHORIZED)
 
-        statuses = Status.objects.order_by("id")
-        tags = Tag.objects.filter(user_id=user.id).order_by("name", "id")
-        categories = Category.objects.filter(user_id=user.id)
+        versions = await aget_versions(reference_version(user.id), STATUS_VERSION)
+        if versions is None:
+            return Response(data=await self._load_reference_data(user.id))
 
-        statuses = [
-            StatusRetriveDTO.model_validate(item).model_dump()
-            async for item in statuses
-        ]
-        tags = [
-            TagRetrieveDTO.model_validate(item).model_dump()
-            async for item in tags
-        ]
-        categories = [
-            CategoryRetriveDTO.model_validate(item).model_dump()
-            async for item in categories
-        ]
+        cache_key = "creation_page_info:%s" % "-".join(str(part) for part in (user.id, *versions))
+        data = await cache.aget(cache_key)
+        if data is None:
+            data = await self._load_reference_data(user.id)
+            await cache.aset(cache_key, data, timeout=REFERENCE_CACHE_SECONDS)
 
-        return Response(data={
-            'statuses': statuses,
-            'tags': tags,
-            'categories': categories,
-        })
+        return Response(data=data)
 
     @login_required
     async def create_tag(
@@ -200,15 +223,39 @@ class TaskAsyncViewSet(ViewSet):
 
         existing = await Tag.objects.filter(name__iexact=name, user_id=user.id).afirst()
         if existing:
-            return Response(data=TagRetrieveDTO.model_validate(existing).model_dump(), status=status.HTTP_200_OK)
+            return Response(data=TagRetrieveDTO.model_validate(existing), status=status.HTTP_200_OK)
 
         tag = await Tag.objects.acreate(name=name, user_id=user.id)
-        return Response(data=TagRetrieveDTO.model_validate(tag).model_dump(), status=status.HTTP_201_CREATED)
+        return Response(data=TagRetrieveDTO.model_validate(tag), status=status.HTTP_201_CREATED)
 
-    async def check_timing(
-        self,
+    @staticmethod
+    def _find_timing_conflict(user_id: int, started_at, finished_at, exclude_task_id: int | None = None) -> dict:
+        """
+        Overlap check plus the nearest free boundaries around the interval,
+        fetched in a single round trip of three indexed subqueries.
+        """
+        tasks = Task.objects.filter(user_id=user_id).timed()
+        if exclude_task_id is not None:
+            tasks = tasks.exclude(id=exclude_task_id)
+
+        conflict = User.objects.filter(id=user_id).annotate(
+            has_overlap=Exists(tasks.overlapping(started_at, finished_at)),
+            available_start=Subquery(
+                tasks.filter(finished_at__lte=started_at).order_by('-finished_at').values('finished_at')[:1]
+            ),
+            available_end=Subquery(
+                tasks.filter(started_at__gte=finished_at).order_by('started_at').values('started_at')[:1]
+            ),
+        ).values('has_overlap', 'available_start', 'available_end').first()
+
+        return conflict or {"has_overlap": False, "available_start": None, "available_end": None}
+
+    @classmethod
+    def check_timing(
+        cls,
         task_create_dto,
         user_id: int,
+        exclude_task_id: int | None = None,
     ) -> TaskCreateErrorDTO:
         task_create_error_dto = TaskCreateErrorDTO()
 
@@ -220,40 +267,31 @@ class TaskAsyncViewSet(ViewSet):
             task_create_error_dto.detail = 'Время начала не может быть больше времени окончания!'
             return task_create_error_dto
 
-        overlap = await Task.objects.filter(
+        conflict = cls._find_timing_conflict(
             user_id=user_id,
-            started_at__isnull=False,
-            finished_at__isnull=False,
-            started_at__lt=task_create_dto.finished_at,
-            finished_at__gt=task_create_dto.started_at,
-        ).aexists()
-
-        if not overlap:
+            started_at=to_aware(task_create_dto.started_at),
+            finished_at=to_aware(task_create_dto.finished_at),
+            exclude_task_id=exclude_task_id,
+        )
+        if not conflict["has_overlap"]:
             return task_create_error_dto
 
         task_create_error_dto.can_create = False
         task_create_error_dto.detail = 'Нельзя создать задачу на это время'
-
-        prev_task = await Task.objects.filter(
-            user_id=user_id,
-            started_at__isnull=False,
-            finished_at__isnull=False,
-            finished_at__lte=task_create_dto.started_at,
-        ).order_by('-finished_at').afirst()
-        if prev_task:
-            task_create_error_dto.available_start = prev_task.finished_at
-
-        next_task = await Task.objects.filter(
-            user_id=user_id,
-            started_at__isnull=False,
-            finished_at__isnull=False,
-            started_at__gte=task_create_dto.finished_at,
-        ).order_by('started_at').afirst()
-        if next_task:
-            task_create_error_dto.available_end = next_task.started_at
+        task_create_error_dto.available_start = conflict["available_start"]
+        task_create_error_dto.available_end = conflict["available_end"]
 
         return task_create_error_dto
 
+    @classmethod
+    def _timing_rejection(cls, task_create_error_dto: TaskCreateErrorDTO) -> Rejected:
+        detail = task_create_error_dto.detail or "Нельзя создать задачу на это время"
+        if task_create_error_dto.available_start:
+            detail += f"\nДата и время начала доступна с {format_dt(task_create_error_dto.available_start)}"
+        if task_create_error_dto.available_end:
+            detail += f"\nДата и время окончания доступна до {format_dt(task_create_error_dto.available_end)}"
+        return Rejected(detail)
+
     @staticmethod
     def _normalize_dt_for_history(value) -> str:
         if value is None:
@@ -263,69 +301,62 @@ class TaskAsyncViewSet(ViewSet):
         except Exception:
             return str(value)
 
-    @staticmethod
-    def _to_naive(dt):
-        if dt is None:
-            return None
-        if timezone.is_aware(dt):
-            return timezone.make_naive(dt, timezone.get_current_timezone())
-        return dt
+    @unit_of_work
+    def _create_task(self, user_id: int, task_create_dto: TaskCreateDTO, subtasks, tags: list, wants_ai_schedule: bool) -> dict:
+        task_payload = task_create_dto.model_dump()
+        deadline_at = task_payload.get("deadline_at") or task_payload.get("finished_at")
+        task_payload["deadline_at"] = deadline_at
+        task_payload["started_at"] = to_aware(task_payload.get("started_at"))
+        task_payload["finished_at"] = to_aware(task_payload.get("finished_at"))
+        task_payload["deadline_at"] = to_aware(task_payload.get("deadline_at"))
+
+        if task_payload.get("status_id") is None:
+            default_status = status_registry.default()
+            if default_status:
+                task_payload["status_id"] = default_status.id
+
+        if wants_ai_schedule:
+            # The slot is picked by the planning worker, the task is created unscheduled.
+            task_payload["started_at"] = None
+            task_payload["finished_at"] = None
+            deadline_ahead = task_payload["deadline_at"] is not None and task_payload["deadline_at"] > timezone.now()
+            task_payload["planning"] = Task.PLANNING_QUEUED if deadline_ahead else Task.PLANNING_UNSCHEDULED
+        else:
+            task_create_error_dto = self.check_timing(task_create_dto=task_create_dto, user_id=user_id)
+            if not task_create_error_dto.can_create:
+                raise self._timing_rejection(task_create_error_dto)
+
+        allowed_tag_ids = list(Tag.objects.filter(user_id=user_id).in_bulk(tags)) if tags else []
+        if len(allowed_tag_ids) != len(tags):
+            raise Rejected('Некорректные тэги')
+
+        task = Task.objects.create(**task_payload, user_id=user_id)
+        if allowed_tag_ids:
+            task.tags.set(allowed_tag_ids)
+        TaskStatusInterval.objects.create(task_id=task.id, status_id=task.status_id, entered_at=task.created_at)
+
+        subtask_objects = [
+            Subtask(**subtask.model_dump(), task_id=task.id)
+            for subtask in subtasks
+            if subtask.name and subtask.name.strip()
+        ]
+        if subtask_objects:
+            Subtask.objects.bulk_create(subtask_objects)
 
-    @staticmethod
-    def _to_aware(dt):
-        if dt is None:
-            return None
-        if timezone.is_naive(dt):
-            return timezone.make_aware(dt, timezone.get_current_timezone())
-        return dt
-
-    async def _compute_free_slots(self, user_id: int, start_dt, end_dt) -> list[PlannerTimeSlot]:
-        start_aware = self._to_aware(start_dt)
-        end_aware = self._to_aware(end_dt)
-        if start_aware is None or end_aware is None or end_aware <= start_aware:
-            return []
+        history = [self._history(task.id, user_id, "Задача", "", "Создана")]
+        if deadline_at is not None:
+            history.append(self._history(task.id, user_id, "Дедлайн", "—", format_dt(to_aware(deadline_at))))
 
-        busy = []
-        qs = Task.objects.filter(
-            user_id=user_id,
-            started_at__isnull=False,
-            finished_at__isnull=False,
-            started_at__lt=end_aware,
-            finished_at__gt=start_aware,
-        ).order_by("started_at")
-
-        async for t in qs:
-            s = max(t.started_at, start_aware)
-            e = min(t.finished_at, end_aware)
-            if s < e:
-                busy.append((s, e))
-
-        if not busy:
-            return [PlannerTimeSlot(start=self._to_naive(start_aware), end=self._to_naive(end_aware))]
-
-        busy.sort(key=lambda x: x[0])
-        merged = []
-        cur_s, cur_e = busy[0]
-        for s, e in busy[1:]:
-            if s <= cur_e:
-                if e > cur_e:
-                    cur_e = e
-            else:
-                merged.append((cur_s, cur_e))
-                cur_s, cur_e = s, e
-        merged.append((cur_s, cur_e))
-
-        free_slots: list[PlannerTimeSlot] = []
-        cursor = start_aware
-        for s, e in merged:
-            if s > cursor:
-                free_slots.append(PlannerTimeSlot(start=self._to_naive(cursor), end=self._to_naive(s)))
-            if e > cursor:
-                cursor = e
-        if cursor < end_aware:
-            free_slots.append(PlannerTimeSlot(start=self._to_naive(cursor), end=self._to_naive(end_aware)))
-
-        return free_slots
+        if task.planning == Task.PLANNING_QUEUED:
+            PlanningJob.objects.create(task_id=task.id)
+        elif task.planning == Task.PLANNING_UNSCHEDULED:
+            history.append(self._history(task.id, user_id, "Планирование (AI)", "—", "Не удалось запланировать"))
+        TaskHistory.objects.bulk_create(history)
+
+        data = {'id': task.id}
+        if task.planning:
+            data['planning'] = task.planning
+        return data
 
     @login_required
     async def create(self,  request: AsyncRequest):
@@ -344,161 +375,42 @@ class TaskAsyncViewSet(ViewSet):
                 tags = []
             tags = list(dict.fromkeys(tags))
 
-            created_subtask_names = [s.name.strip() for s in subtask_bulk_crreate_dto.subtasks if s.name and s.name.strip()]
             wants_ai_schedule = (
                 task_create_dto.started_at is None
                 and (task_create_dto.deadline_at is not None or task_create_dto.finished_at is not None)
             )
 
-            task_payload = task_create_dto.model_dump()
-            deadline_at = task_payload.get("deadline_at") or task_payload.get("finished_at")
-            task_payload["deadline_at"] = deadline_at
-            task_payload["started_at"] = self._to_aware(task_payload.get("started_at"))
-            task_payload["finished_at"] = self._to_aware(task_payload.get("finished_at"))
-            task_payload["deadline_at"] = self._to_aware(task_payload.get("deadline_at"))
-
-            if task_payload.get("status_id") is None:
-                default_status = await Status.objects.order_by("id").afirst()
-                if default_status:
-                    task_payload["status_id"] = default_status.id
-
-            ai_result = None
-            if wants_ai_schedule:
-                now = timezone.now()
-                deadline_aware = self._to_aware(deadline_at)
-                if deadline_aware and deadline_aware > now:
-                    free_slots = await self._compute_free_slots(user_id=user.id, start_dt=now, end_dt=deadline_aware)
-
-                    tag_names = []
-                    if tags:
-                        async for t in Tag.objects.filter(id__in=tags, user_id=user.id):
-                            tag_names.append(t.name)
-
-                    wake = getattr(user, "wake_up_time", None)
-                    bed = getattr(user, "bed_time", None)
-                    wake_up_time = wake.strftime("%H:%M") if wake else "08:00"
-                    bed_time = bed.strftime("%H:%M") if bed else "23:00"
-
-                    planner_task = PlannerTaskInput(
-                        title=task_create_dto.name,
-                        description=task_create_dto.description or "",
-                        tags=tag_names,
-                        wake_up_time=wake_up_time,
-                        bed_time=bed_time,
-                        free_slots=free_slots,
-                        deadline=self._to_naive(deadline_aware),
-                    )
-
-                    try:
-                        ai_result = await sync_to_async(analyze_task, thread_sensitive=False)(planner_task)
-                    except Exception as exc:
-                        logging.exception("AI planning error")
-                        ai_result = None
-
-                if ai_result and ai_result.scheduling and ai_result.scheduling.is_scheduled and ai_result.scheduling.slot:
-                    task_payload["started_at"] = self._to_aware(ai_result.scheduling.slot.start)
-                    task_payload["finished_at"] = self._to_aware(ai_result.scheduling.slot.end)
-                else:
-                    task_payload["started_at"] = None
-                    task_payload["finished_at"] = None
-
-            if not wants_ai_schedule:
-                task_create_error_dto = await self.check_timing(task_create_dto=task_create_dto, user_id=user.id)
-                if not task_create_error_dto.can_create:
-                    detail = task_create_error_dto.detail or "Нельзя создать задачу на это время"
-                    if task_create_error_dto.available_start:
-                        detail += f"\nДата и время начала доступна с {self._format_dt(task_create_error_dto.available_start)}"
-                    if task_create_error_dto.available_end:
-                        detail += f"\nДата и время окончания доступна до {self._format_dt(task_create_error_dto.available_end)}"
-                    return Response(data={'detail': detail}, status=status.HTTP_400_BAD_REQUEST)
-
-            allowed_tag_ids = []
-            if tags:
-                async for t in Tag.objects.filter(id__in=tags, user_id=user.id):
-                    allowed_tag_ids.append(t.id)
-            if len(allowed_tag_ids) != len(tags):
-                return Response(data={'detail': 'Некорректные тэги'}, status=status.HTTP_400_BAD_REQUEST)
-
-            task = await Task.objects.acreate(**task_payload, user_id=user.id)
-            await task.tags.aset(allowed_tag_ids)
-
-            ai_actions = []
-            if wants_ai_schedule and not created_subtask_names and ai_result and ai_result.actions:
-                seen = set()
-                for a in ai_result.actions:
-                    name = str(a).strip()
-                    if not name:
-                        continue
-                    key = name.casefold()
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    ai_actions.append(name[:127])
-
-            subtask_objects = []
-            for subtask in subtask_bulk_crreate_dto.subtasks:
-                if not subtask.name or not subtask.name.strip():
-                    continue
-                subtask_objects.append(Subtask(**subtask.model_dump(), task_id=task.id))
-            for name in ai_actions:
-                subtask_objects.append(Subtask(name=name, completed=False, task_id=task.id))
-
-            if subtask_objects:
-                await sync_to_async(Subtask.objects.bulk_create)(subtask_objects)
-
-            await self._add_history(
-                task_id=task.id,
-                user=user,
-                field="Задача",
-                old_value="",
-                new_value="Создана",
+            data = await self._create_task(
+                user.id, task_create_dto, subtask_bulk_crreate_dto.subtasks, tags, wants_ai_schedule,
             )
-
-            if deadline_at is not None:
-                await self._add_history(
-                    task_id=task.id,
-                    user=user,
-                    field="Дедлайн",
-                    old_value="—",
-                    new_value=self._format_dt(self._to_aware(deadline_at)),
-                )
-
-            if wants_ai_schedule:
-                if ai_result and ai_result.scheduling and ai_result.scheduling.is_scheduled and ai_result.scheduling.slot:
-                    await self._add_history(
-                        task_id=task.id,
-                        user=user,
-                        field="Планирование (AI)",
-                        old_value="—",
-                        new_value=f"{self._format_dt(task.started_at)} → {self._format_dt(task.finished_at)}",
-                    )
-                else:
-                    await self._add_history(
-                        task_id=task.id,
-                        user=user,
-                        field="Планирование (AI)",
-                        old_value="—",
-                        new_value=(ai_result.scheduling.message if ai_result and ai_result.scheduling else "Не удалось запланировать"),
-                    )
-
-            if ai_actions:
-                await self._add_history(
-                    task_id=task.id,
-                    user=user,
-                    field="Подзадачи (AI)",
-                    old_value="—",
-                    new_value=self._history_text(", ".join(ai_actions)),
-                )
-
             return Response(
-                data={'id':  task.id},
+                data=data,
                 status=status.HTTP_201_CREATED
             )
 
+        except Rejected as exc:
+            return Response(data={'detail': exc.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:
             logging.error(exc)
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    @unit_of_work
+    def _set_subtask_completed(self, user_id: int, task_id: int, subtask_id: int, completed: bool | None):
+        subtask = Subtask.objects.select_for_update().get(id=subtask_id, task_id=task_id, task__user_id=user_id)
+
+        new_completed = (not subtask.completed) if completed is None else bool(completed)
+        if new_completed == subtask.completed:
+            return
+
+        old_text = "Выполнена" if subtask.completed else "Не выполнена"
+        new_text = "Выполнена" if new_completed else "Не выполнена"
+
+        subtask.completed = new_completed
+        subtask.save(update_fields=["completed"])
+        TaskHistory.objects.bulk_create([
+            self._history(task_id, user_id, f"Подзадача: {history_text(subtask.name)}", old_text, new_text),
+        ])
+
     @login_required
     async def update_subtask_completed(self, request: AsyncRequest, task_id: int, subtask_id: int):
         user = request.user
@@ -507,33 +419,158 @@ class TaskAsyncViewSet(ViewSet):
 
         dto = SubtaskCompletedUpdateDTO(**request.data) if request.data else SubtaskCompletedUpdateDTO()
         try:
-            subtask = await Subtask.objects.select_related('task').aget(
-                id=subtask_id,
-                task_id=task_id,
-                task__user_id=user.id,
-            )
+            await self._set_subtask_completed(user.id, task_id, subtask_id, dto.completed)
         except Subtask.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        new_completed = (not subtask.completed) if dto.completed is None else bool(dto.completed)
-        if new_completed == subtask.completed:
-            return Response(status=status.HTTP_200_OK)
-
-        old_text = "Выполнена" if subtask.completed else "Не выполнена"
-        new_text = "Выполнена" if new_completed else "Не выполнена"
+        return Response(status=status.HTTP_200_OK)
 
-        subtask.completed = new_completed
-        await subtask.asave(update_fields=["completed"])
-
-        await self._add_history(
-            task_id=task_id,
-            user=user,
-            field=f"Подзадача: {self._history_text(subtask.name)}",
-            old_value=old_text,
-            new_value=new_text,
+    @classmethod
+    @unit_of_work
+    def _apply_update(cls, task_id: int, user, data: dict, task_update_dto: TaskCreateDTO, tags: list, subtasks_payload: list):
+        """
+        The whole form save in one transaction: primary key lookups, one
+        bulk_update / bulk_create for subtasks and one bulk_create for all
+        history rows.
+        """
+        task = (
+            Task.objects
+            .select_related('category', 'sprint')
+            .prefetch_related('tags', 'subtasks')
+            .select_for_update(of=("self",))
+            .get(id=task_id, user_id=user.id)
         )
+        if task.status_id is not None:
+            task.status = status_registry.get(task.status_id)
+
+        old_name = task.name
+        old_description = task.description
+        old_started_at = task.started_at
+        old_finished_at = task.finished_at
+        old_deadline_at = task.deadline_at
+        old_status = task.status
+        old_sprint = task.sprint
+        old_category = task.category
+        old_tags = {t.id: t for t in task.tags.all()}
+        old_subtasks = list(task.subtasks.all())
+        old_subtask_names = [s.name for s in old_subtasks]
+
+        status_id = task_update_dto.status_id
+        if status_id is None:
+            task.status = None
+        elif status_id != task.status_id:
+            task.status = cls._registered_status(status_id)
+
+        if "sprint_id" in data:
+            sprint_id = task_update_dto.sprint_id
+            if sprint_id is None:
+                task.sprint = None
+            elif sprint_id != task.sprint_id:
+                task.sprint = Sprint.objects.get(id=sprint_id)
+
+        category_id = task_update_dto.category_id
+        if category_id is None:
+            task.category = None
+        elif category_id != task.category_id:
+            task.category = Category.objects.get(id=category_id, user_id=user.id)
+
+        new_tags = Tag.objects.filter(user_id=user.id).in_bulk(tags) if tags else {}
+        if len(new_tags) != len(tags):
+            raise ValueError("Некорректные тэги")
+
+        # Same check as create, the task does not conflict with itself
+        task_create_error_dto = cls.check_timing(task_create_dto=task_update_dto, user_id=user.id, exclude_task_id=task_id)
+        if not task_create_error_dto.can_create:
+            raise cls._timing_rejection(task_create_error_dto)
+
+        task.name = task_update_dto.name
+        task.description = task_update_dto.description
+        task.started_at = to_aware(task_update_dto.started_at)
+        task.finished_at = to_aware(task_update_dto.finished_at)
+        new_deadline_at = task_update_dto.deadline_at
+        if new_deadline_at is None and task.deadline_at is None and task_update_dto.finished_at is not None:
+            new_deadline_at = task_update_dto.finished_at
+        task.deadline_at = to_aware(new_deadline_at)
+        if task.started_at is not None:
+            # Scheduled by hand, a waiting planning job leaves it alone
+            task.planning = ""
+        task.save()
+
+        if set(old_tags) != set(new_tags):
+            task.tags.set(list(new_tags))
+
+        existing_subtasks = {s.id: s for s in old_subtasks}
+        renamed_subtasks = []
+        created_subtasks = []
+        for item in subtasks_payload:
+            if not isinstance(item, dict):
+                continue
+            name = str(item.get("name", "")).strip()
+            if not name:
+                continue
+            sid = item.get("id", None)
+            if sid:
+                try:
+                    subtask = existing_subtasks.get(int(sid))
+                except (TypeError, ValueError):
+                    subtask = None
+                if subtask is not None and subtask.name != name:
+                    subtask.name = name
+                    renamed_subtasks.append(subtask)
+            else:
+                created_subtasks.append(Subtask(task_id=task_id, name=name, completed=False))
+        if renamed_subtasks:
+            Subtask.objects.bulk_update(renamed_subtasks, ["name"])
+        if created_subtasks:
+            Subtask.objects.bulk_create(created_subtasks)
+        if renamed_subtasks or created_subtasks:
+            # Bulk writes send no signals
+            queue_task_update(task_id, action="update", user_id=user.id, fields=("subtasks",))
 
-        return Response(status=status.HTTP_200_OK)
+        history = []
+
+        def add_history(field: str, old_value: str, new_value: str):
+            history.append(cls._history(task_id, user.id, field, old_value, new_value))
+
+        new_subtask_names = [s.name for s in old_subtasks] + [s.name for s in created_subtasks]
+        if old_subtask_names != new_subtask_names:
+            add_history("Подзадачи", history_text(", ".join(old_subtask_names)), history_text(", ".join(new_subtask_names)))
+
+        if old_name != task.name:
+            add_history("Название", history_text(old_name), history_text(task.name))
+
+        if old_description != task.description:
+            add_history("Описание", history_text(old_description), history_text(task.description))
+
+        if old_started_at != task.started_at:
+            add_history("Начало выполнения", format_dt(old_started_at), format_dt(task.started_at))
+
+        if old_finished_at != task.finished_at:
+            add_history("Конец выполнения", format_dt(old_finished_at), format_dt(task.finished_at))
+
+        if old_deadline_at != task.deadline_at:
+            add_history("Дедлайн", format_dt(old_deadline_at), format_dt(task.deadline_at))
+
+        if old_status != task.status:
+            TaskStatusInterval.objects.transition(task_id, task.status_id, timezone.now())
+            add_history("Статус", history_text(old_status.name if old_status else "—"),
+                        history_text(task.status.name if task.status else "—"))
+
+        if old_sprint != task.sprint:
+            add_history("Спринт", history_text(old_sprint.name if old_sprint else "—"),
+                        history_text(task.sprint.name if task.sprint else "—"))
+
+        if old_category != task.category:
+            add_history("Сфера", history_text(old_category.name if old_category else "—"),
+                        history_text(task.category.name if task.category else "—"))
+
+        if set(old_tags) != set(new_tags):
+            add_history("Тэги", history_text(", ".join(t.name for t in old_tags.values())),
+                        history_text(", ".join(t.name for t in new_tags.values())))
+
+        if history:
+            TaskHistory.objects.bulk_create(history)
+        return task
 
     @login_required
     async def update(self, request: AsyncRequest, task_id: int):
@@ -555,170 +592,53 @@ class TaskAsyncViewSet(ViewSet):
             if subtasks_payload is None:
                 subtasks_payload = []
 
-            task = await Task.objects.select_related(
-                'category',
-                'sprint',
-                'status',
-            ).prefetch_related(
-                'tags',
-                'subtasks',
-            ).aget(id=task_id, user_id=user.id)
-
-            old_name = task.name
-            old_description = task.description
-            old_started_at = task.started_at
-            old_finished_at = task.finished_at
-            old_deadline_at = task.deadline_at
-            old_status_name = task.status.name if task.status else "—"
-            old_status_id = task.status.id if task.status else None
-            old_sprint_name = task.sprint.name if task.sprint else "—"
-            old_sprint_id = task.sprint.id if task.sprint else None
-            old_category_name = task.category.name if task.category else "—"
-            old_category_id = task.category.id if task.category else None
-
-            old_tag_ids = []
-            async for t in task.tags.all():
-                old_tag_ids.append(t.id)
-
-            old_subtask_names = []
-            async for s in task.subtasks.all():
-                old_subtask_names.append(s.name)
-
-            status_id = task_update_dto.status_id
-            category_id = task_update_dto.category_id
-
-            if status_id is not None:
-                new_status = await Status.objects.aget(id=status_id)
-                task.status = new_status
-            else:
-                task.status = None
-
-            if "sprint_id" in data:
-                sprint_id = task_update_dto.sprint_id
-                if sprint_id is not None:
-                    new_sprint = await Sprint.objects.aget(id=sprint_id)
-                    task.sprint = new_sprint
-                else:
-                    task.sprint = None
-
-            if category_id is not None:
-                new_category = await Category.objects.aget(id=category_id, user_id=user.id)
-                task.category = new_category
-            else:
-                task.category = None
-
-            task.name = task_update_dto.name
-            task.description = task_update_dto.description
-            task.started_at = self._to_aware(task_update_dto.started_at)
-            task.finished_at = self._to_aware(task_update_dto.finished_at)
-            new_deadline_at = task_update_dto.deadline_at
-            if new_deadline_at is None and task.deadline_at is None and task_update_dto.finished_at is not None:
-                new_deadline_at = task_update_dto.finished_at
-            task.deadline_at = self._to_aware(new_deadline_at)
-
-            await task.asave()
-            allowed_tag_ids = []
-            if tags:
-                async for t in Tag.objects.filter(id__in=tags, user_id=user.id):
-                    allowed_tag_ids.append(t.id)
-            if len(allowed_tag_ids) != len(tags):
-                return Response(data={'detail': 'Некорректные тэги'}, status=status.HTTP_400_BAD_REQUEST)
-            await task.tags.aset(allowed_tag_ids)
-
-            created_subtasks = []
-            updated_subtasks = []
-            for item in (subtasks_payload or []):
-                if not isinstance(item, dict):
-                    continue
-                name = str(item.get("name", "")).strip()
-                if not name:
-                    continue
-                sid = item.get("id", None)
-                if sid:
-                    try:
-                        s = await Subtask.objects.aget(id=sid, task_id=task_id)
-                    except Subtask.DoesNotExist:
-                        continue
-                    if s.name != name:
-                        s.name = name
-                        await s.asave(update_fields=["name"])
-                        updated_subtasks.append(name)
-                else:
-                    created_subtasks.append(Subtask(task_id=task_id, name=name, completed=False))
-            if created_subtasks:
-                await sync_to_async(Subtask.objects.bulk_create)(created_subtasks)
-
-            new_subtask_names = []
-            async for s in Subtask.objects.filter(task_id=task_id).order_by("id"):
-                new_subtask_names.append(s.name)
-            if old_subtask_names != new_subtask_names:
-                await self._add_history(
-                    task_id=task_id,
-                    user=user,
-                    field="Подзадачи",
-                    old_value=self._history_text(", ".join(old_subtask_names)),
-                    new_value=self._history_text(", ".join(new_subtask_names)),
-                )
-
-            if old_name != task.name:
-                await self._add_history(task_id=task_id, user=user, field="Название",
-                                        old_value=self._history_text(old_name), new_value=self._history_text(task.name))
-
-            if old_description != task.description:
-                await self._add_history(task_id=task_id, user=user, field="Описание",
-                                        old_value=self._history_text(old_description), new_value=self._history_text(task.description))
-
-            if old_started_at != task.started_at:
-                await self._add_history(task_id=task_id, user=user, field="Начало выполнения",
-                                        old_value=self._format_dt(old_started_at), new_value=self._format_dt(task.started_at))
-
-            if old_finished_at != task.finished_at:
-                await self._add_history(task_id=task_id, user=user, field="Конец выполнения",
-                                        old_value=self._format_dt(old_finished_at), new_value=self._format_dt(task.finished_at))
-
-            if old_deadline_at != task.deadline_at:
-                await self._add_history(task_id=task_id, user=user, field="Дедлайн",
-                                        old_value=self._format_dt(old_deadline_at), new_value=self._format_dt(task.deadline_at))
-
-            new_status_id = task.status.id if task.status else None
-            if old_status_id != new_status_id:
-                new_status_name = task.status.name if task.status else "—"
-                await self._add_history(task_id=task_id, user=user, field="Статус",
-                                        old_value=self._history_text(old_status_name), new_value=self._history_text(new_status_name))
-
-            new_sprint_id = task.sprint.id if task.sprint else None
-            if old_sprint_id != new_sprint_id:
-                new_sprint_name = task.sprint.name if task.sprint else "—"
-                await self._add_history(task_id=task_id, user=user, field="Спринт",
-                                        old_value=self._history_text(old_sprint_name), new_value=self._history_text(new_sprint_name))
-
-            new_category_id = task.category.id if task.category else None
-            if old_category_id != new_category_id:
-                new_category_name = task.category.name if task.category else "—"
-                await self._add_history(task_id=task_id, user=user, field="Сфера",
-                                        old_value=self._history_text(old_category_name), new_value=self._history_text(new_category_name))
-
-            new_tag_ids = []
-            async for t in task.tags.all():
-                new_tag_ids.append(t.id)
-            if set(old_tag_ids) != set(new_tag_ids):
-                old_tag_names = []
-                async for t in Tag.objects.filter(id__in=old_tag_ids):
-                    old_tag_names.append(t.name)
-                new_tag_names = []
-                async for t in Tag.objects.filter(id__in=new_tag_ids):
-                    new_tag_names.append(t.name)
-                await self._add_history(task_id=task_id, user=user, field="Тэги",
-                                        old_value=self._history_text(", ".join(old_tag_names)),
-                                        new_value=self._history_text(", ".join(new_tag_names)))
-
+            task = await self._apply_update(task_id, user, data, task_update_dto, tags, subtasks_payload)
             return Response(data={'id': task.id}, status=status.HTTP_200_OK)
         except Task.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        except Rejected as exc:
+            return Response(data={'detail': exc.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:
             logging.error(f"Update task error: {exc}")
             return Response(data={'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @unit_of_work
+    def _move_task(self, user_id: int, task_id: int, new_started_at, new_finished_at) -> Task:
+        task = Task.objects.select_for_update().get(id=task_id, user_id=user_id)
+        old_started_at = task.started_at
+        old_finished_at = task.finished_at
+
+        conflict = self._find_timing_conflict(
+            user_id=user_id,
+            started_at=new_started_at,
+            finished_at=new_finished_at,
+            exclude_task_id=task_id,
+        )
+
+        if conflict["has_overlap"]:
+            detail = "Нельзя переместить задачу на это время"
+            if conflict["available_start"]:
+                detail += f"\nДата и время начала доступна с {format_dt(conflict['available_start'])}"
+            if conflict["available_end"]:
+                detail += f"\nДата и время окончания доступна до {format_dt(conflict['available_end'])}"
+            raise Rejected(detail)
+
+        task.started_at = new_started_at
+        task.finished_at = new_finished_at
+        task.planning = ""
+        task.save(update_fields=["started_at", "finished_at", "planning"])
+
+        history = []
+        if old_started_at != task.started_at:
+            history.append(self._history(task.id, user_id, "Начало выполнения",
+                                         format_dt(old_started_at), format_dt(task.started_at)))
+        if old_finished_at != task.finished_at:
+            history.append(self._history(task.id, user_id, "Конец выполнения",
+                                         format_dt(old_finished_at), format_dt(task.finished_at)))
+        if history:
+            TaskHistory.objects.bulk_create(history)
+        return task
+
     @login_required
     async def update_timing(self, request: AsyncRequest, task_id: int):
         user = request.user
@@ -727,83 +647,31 @@ class TaskAsyncViewSet(ViewSet):
 
         try:
             dto = TaskTimingUpdateDTO(**request.data)
-            new_started_at = self._to_aware(dto.started_at)
-            new_finished_at = self._to_aware(dto.finished_at)
+            new_started_at = to_aware(dto.started_at)
+            new_finished_at = to_aware(dto.finished_at)
 
             if new_started_at is None or new_finished_at is None:
                 return Response(data={"detail": "Нужно передать started_at и finished_at"}, status=status.HTTP_400_BAD_REQUEST)
             if new_started_at >= new_finished_at:
                 return Response(data={"detail": "Время начала не может быть больше времени окончания!"}, status=status.HTTP_400_BAD_REQUEST)
 
-            task = await Task.objects.aget(id=task_id, user_id=user.id)
-            old_started_at = task.started_at
-            old_finished_at = task.finished_at
-
-            overlap = await Task.objects.filter(
-                user_id=user.id,
-                started_at__isnull=False,
-                finished_at__isnull=False,
-                started_at__lt=new_finished_at,
-                finished_at__gt=new_started_at,
-            ).exclude(id=task_id).aexists()
-
-            if overlap:
-                detail = "Нельзя переместить задачу на это время"
-
-                prev_task = await Task.objects.filter(
-                    user_id=user.id,
-                    started_at__isnull=False,
-                    finished_at__isnull=False,
-                    finished_at__lte=new_started_at,
-                ).exclude(id=task_id).order_by('-finished_at').afirst()
-                if prev_task:
-                    detail += f"\nДата и время начала доступна с {self._format_dt(prev_task.finished_at)}"
-
-                next_task = await Task.objects.filter(
-                    user_id=user.id,
-                    started_at__isnull=False,
-                    finished_at__isnull=False,
-                    started_at__gte=new_finished_at,
-                ).exclude(id=task_id).order_by('started_at').afirst()
-                if next_task:
-                    detail += f"\nДата и время окончания доступна до {self._format_dt(next_task.started_at)}"
-
-                return Response(data={"detail": detail}, status=status.HTTP_400_BAD_REQUEST)
-
-            task.started_at = new_started_at
-            task.finished_at = new_finished_at
-            await task.asave(update_fields=["started_at", "finished_at"])
-
-            if old_started_at != task.started_at:
-                await self._add_history(
-                    task_id=task.id,
-                    user=user,
-                    field="Начало выполнения",
-                    old_value=self._format_dt(old_started_at),
-                    new_value=self._format_dt(task.started_at),
-                )
-
-            if old_finished_at != task.finished_at:
-                await self._add_history(
-                    task_id=task.id,
-                    user=user,
-                    field="Конец выполнения",
-                    old_value=self._format_dt(old_finished_at),
-                    new_value=self._format_dt(task.finished_at),
-                )
+            task = await self._move_task(user.id, task_id, new_started_at, new_finished_at)
 
             return Response(data={
                 "id": task.id,
-                "started_at": self._format_dt(task.started_at),
-                "finished_at": self._format_dt(task.finished_at),
+                "started_at": format_dt(task.started_at),
+                "finished_at": format_dt(task.finished_at),
             }, status=status.HTTP_200_OK)
         except Task.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        except Rejected as exc:
+            return Response(data={"detail": exc.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:
             logging.error(f"Update timing error: {exc}")
             return Response(data={"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
     @login_required
+    @conditional(_task_etag)
     async def retrive(
         self,
         request: AsyncRequest,
@@ -814,27 +682,42 @@ class TaskAsyncViewSet(ViewSet):
             return Response(status=status.HTTP_401_UNAUTHORIZED)
 
         try:
-            # Use prefetch_related for M2M and select_related for FK to avoid sync DB access in async context
-            # during Pydantic validation
-            task = await Task.objects.select_related(
-                'category',
-                'sprint',
-                'status',
-                'user'
-            ).prefetch_related(
-                'tags',
-                'subtasks'
-            ).aget(id=task_id, user_id=user.id)
+            fieldset = TaskFieldset.from_query(request.query_params, TASK_DETAIL)
+        except ValueError as exc:
+            return Response(data={'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Relations are loaded up front (see TaskFieldset.apply), the dump must not hit the DB
+            task = await fieldset.apply(Task.objects).aget(id=task_id, user_id=user.id)
         except Task.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        if "status" in fieldset.include:
+            task.status = await status_registry.aget(task.status_id)
 
-        task_retrive_dto = TaskRetrieveDTO.model_validate(task)
-        
-        lifecycle, total_dur = await self._calculate_lifecycle(task)
-        task_retrive_dto.lifecycle = lifecycle
-        task_retrive_dto.total_duration = total_dur
+        data = fieldset.dump(task)
+        if "lifecycle" in fieldset.include:
+            data["lifecycle"], data["total_duration"] = await self._calculate_lifecycle(task)
+
+        return Response(data=data)
+
+    @unit_of_work
+    def _change_status(self, user_id: int, task_id: int, status_id: int):
+        task = Task.objects.select_for_update(of=("self",)).get(id=task_id, user_id=user_id)
+
+        # Verify status exists
+        new_status = self._registered_status(status_id)
 
-        return Response(data=task_retrive_dto.model_dump())
+        if task.status_id == new_status.id:
+            return
+        old_status = status_registry.get(task.status_id)
+        old_status_name = old_status.name if old_status else "—"
+
+        task.status = new_status
+        task.save(update_fields=["status"])
+        TaskStatusInterval.objects.transition(task_id, new_status.id, timezone.now())
+        TaskHistory.objects.bulk_create([
+            self._history(task_id, user_id, "Статус", old_status_name, new_status.name),
+        ])
 
     @login_required
     async def update_status(self, request: AsyncRequest, task_id: int):
@@ -844,27 +727,7 @@ class TaskAsyncViewSet(ViewSet):
 
         try:
             status_dto = TaskStatusUpdateDTO(**request.data)
-            task = await Task.objects.select_related('status').aget(id=task_id, user_id=user.id)
-
-            # Verify status exists
-            new_status = await Status.objects.aget(id=status_dto.status_id)
-
-            old_status_name = task.status.name if task.status else "—"
-            old_status_id = task.status.id if task.status else None
-            if old_status_id == new_status.id:
-                return Response(status=status.HTTP_200_OK)
-
-            task.status = new_status
-            await task.asave(update_fields=["status"])
-
-            await self._add_history(
-                task_id=task_id,
-                user=user,
-                field="Статус",
-                old_value=old_status_name,
-                new_value=new_status.name,
-            )
-
+            await self._change_status(user.id, task_id, status_dto.status_id)
             return Response(status=status.HTTP_200_OK)
         except (Task.DoesNotExist, Status.DoesNotExist):
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -872,7 +735,55 @@ class TaskAsyncViewSet(ViewSet):
             logging.error(f"Update status error: {e}, Data: {request.data}")
             return Response(data={'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def _encode_canban_cursor(task) -> str:
+        raw = f"{task.created_at.isoformat()}|{task.id}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_canban_cursor(value: str):
+        raw = base64.urlsafe_b64decode(value.encode("ascii")).decode("utf-8")
+        created_at, task_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(task_id)
+
+    @staticmethod
+    def _canban_limit(value) -> int:
+        try:
+            limit = int(value)
+        except (TypeError, ValueError):
+            return CANBAN_PAGE_SIZE
+        return max(1, min(limit, CANBAN_MAX_PAGE_SIZE))
+
+    async def _get_canban_column_page(
+        self, task_filter: dict, status_id: int, cursor, limit: int, fieldset: TaskFieldset,
+    ) -> Response:
+        qs = fieldset.apply(
+            Task.objects
+            .filter(**task_filter, status_id=status_id)
+            .order_by('-created_at', '-id')
+        )
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = self._decode_canban_cursor(cursor)
+            except Exception:
+                return Response(data={'detail': 'Некорректный курсор'}, status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(
+                Q(created_at__lt=cursor_created_at)
+                | Q(created_at=cursor_created_at, id__lt=cursor_id)
+            )
+
+        tasks = [t async for t in qs[:limit + 1]]
+        next_cursor = self._encode_canban_cursor(tasks[limit - 1]) if len(tasks) > limit else None
+
+        page = CanbanColumnPageRetriveDTO(
+            id=status_id,
+            next_cursor=next_cursor,
+            tasks=[fieldset.dump(t) for t in tasks[:limit]],
+        )
+        return Response(data=page, status=status.HTTP_200_OK)
+
     @login_required
+    @conditional(_board_etag)
     async def get_canaban_table(
         self,
         request: AsyncRequest,
@@ -889,30 +800,78 @@ class TaskAsyncViewSet(ViewSet):
         if category_id_int is not None:
             task_filter["category_id"] = category_id_int
 
-        statuses = (
-            Status.objects
-            .prefetch_related(
-                Prefetch(
-                    'task_set',
-                    queryset=Task.objects.prefetch_related(
-                        'subtasks',
-                        'tags',
-                    ).filter(**task_filter),
+        limit = self._canban_limit(request.query_params.get("limit"))
+        try:
+            fieldset = TaskFieldset.from_query(request.query_params, BOARD_CARD)
+        except ValueError as exc:
+            return Response(data={'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        status_id = request.query_params.get("status_id")
+        if status_id:
+            try:
+                status_id_int = int(status_id)
+            except Exception:
+                return Response(data={'detail': 'Некорректный статус'}, status=status.HTTP_400_BAD_REQUEST)
+            return await self._get_canban_column_page(
+                task_filter=task_filter,
+                status_id=status_id_int,
+                cursor=request.query_params.get("cursor"),
+                limit=limit,
+                fieldset=fieldset,
+            )
+
+        totals = {
+            row["status_id"]: row["total"]
+            async for row in (
+                Task.objects
+                .filter(**task_filter, status__isnull=False)
+                .order_by()
+                .values("status_id")
+                .annotate(total=Count("id"))
+            )
+        }
+
+        # First page of every column in one statement: rank cards inside each
+        # status and keep limit + 1 rows to know whether a next page exists.
+        first_pages = fieldset.apply(
+            Task.objects
+            .filter(**task_filter, status__isnull=False)
+            .annotate(
+                column_position=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("status_id")],
+                    order_by=[F("created_at").desc(), F("id").desc()],
                 )
             )
-            .all()
+            .filter(column_position__lte=limit + 1)
+            .order_by('status_id', '-created_at', '-id')
         )
 
-        canabna_list = [
-            CanbanColumnRetriveDTO.model_validate(stat).model_dump()
-            async for stat in statuses
-        ]
-
+        statuses = list((await status_registry.amapping()).values())
+
+        async def columns():
+            # Rows arrive grouped by status in the order of statuses, so only
+            # one column is held in memory at a time.
+            rows = first_pages.aiterator(chunk_size=STREAM_CHUNK_SIZE)
+            row = await anext(rows, None)
+            for stat in statuses:
+                tasks = []
+                while row is not None and row.status_id <= stat.id:
+                    if row.status_id == stat.id:
+                        tasks.append(row)
+                    row = await anext(rows, None)
+                next_cursor = self._encode_canban_cursor(tasks[limit - 1]) if len(tasks) > limit else None
+                yield CanbanColumnRetriveDTO(
+                    id=stat.id,
+                    name=stat.name,
+                    color=stat.color,
+                    total=totals.get(stat.id, 0),
+                    next_cursor=next_cursor,
+                    tasks=[fieldset.dump(t) for t in tasks[:limit]],
+                )
 
-        return Response(
-            data=canabna_list,
-            status=status.HTTP_200_OK,
-        )
+        # The first column runs the query, so a failing one still gets an error status
+        return StreamingJSONResponse(json_array(await prefetched(columns(), count=1), chunk_size=1))
 
     @staticmethod
     def _week_start_from_iso(value=None):
@@ -952,15 +911,23 @@ class TaskAsyncViewSet(ViewSet):
         return segments
 
     @login_required
+    @conditional(_calendar_etag)
+    @replica_reads
     async def list_calendar(self, request: AsyncRequest):
         user = request.user
         if not user.is_authenticated:
             return Response(status=status.HTTP_401_UNAUTHORIZED)
 
+        try:
+            fieldset = TaskFieldset.from_query(request.query_params, CALENDAR_ENTRY)
+        except ValueError as exc:
+            return Response(data={'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
         week_start = self._week_start_from_iso(request.query_params.get("week_start"))
         week_end = week_start + timedelta(days=7)
+        statuses = await status_registry.amapping() if "status" in fieldset.include else {}
 
-        qs = (
+        qs = fieldset.apply(
             Task.objects.filter(
                 user_id=user.id,
                 started_at__isnull=False,
@@ -971,29 +938,34 @@ class TaskAsyncViewSet(ViewSet):
             .order_by("started_at")
         )
 
-        tasks = []
-        async for t in qs:
-            segments = self._split_into_day_segments(t.started_at, t.finished_at, week_start, week_end)
-            if not segments:
-                continue
-            if len(segments) == 1:
-                s, e = segments[0]
-                tasks.append({
-                    "id": t.id,
-                    "title": t.name,
-                    "started_at": self._format_dt(s),
-                    "ended_at": self._format_dt(e),
-                })
-                continue
+        async def tasks():
+            async for t in qs.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+                segments = self._split_into_day_segments(t.started_at, t.finished_at, week_start, week_end)
+                if not segments:
+                    continue
+                if "status" in fieldset.include:
+                    t.status = statuses.get(t.status_id)
+                extra = fieldset.dump(t)
+                if len(segments) == 1:
+                    s, e = segments[0]
+                    yield {
+                        "id": t.id,
+                        "title": t.name,
+                        "started_at": format_dt(s),
+                        "ended_at": format_dt(e),
+                        **extra,
+                    }
+                    continue
 
-            for idx, (s, e) in enumerate(segments, start=1):
-                tasks.append({
-                    "id": f"{t.id}:{idx}",
-                    "source_id": t.id,
-                    "title": t.name,
-                    "started_at": self._format_dt(s),
-                    "ended_at": self._format_dt(e),
-                })
+                for idx, (s, e) in enumerate(segments, start=1):
+                    yield {
+                        "id": f"{t.id}:{idx}",
+                        "source_id": t.id,
+                        "title": t.name,
+                        "started_at": format_dt(s),
+                        "ended_at": format_dt(e),
+                        **extra,
+                    }
 
         week_days = []
         week_day_names = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
@@ -1006,12 +978,11 @@ class TaskAsyncViewSet(ViewSet):
                 "label": f"{week_day_names[i]}, {d.day}",
             })
 
-        return Response(data={
+        return StreamingJSONResponse(json_object({
             "week_start": timezone.localtime(week_start).date().strftime("%Y-%m-%d"),
             "week_end": timezone.localtime(week_end - timedelta(seconds=1)).date().strftime("%Y-%m-%d"),
             "days": week_days,
-            "tasks": tasks,
-        }, status=status.HTTP_200_OK)
+        }, "tasks", await prefetched(tasks())))
 
     @login_required
     async def create_comment(self, request: AsyncRequest, task_id: int):
@@ -1045,7 +1016,7 @@ class TaskAsyncViewSet(ViewSet):
                 user_name=user.username  # Assuming User model has username field
             )
 
-            return Response(data=response_dto.model_dump(), status=status.HTTP_201_CREATED)
+            return Response(data=response_dto, status=status.HTTP_201_CREATED)
         except Task.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -1053,6 +1024,7 @@ class TaskAsyncViewSet(ViewSet):
             return Response(data={'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @login_required
+    @replica_reads
     async def list_comments(self, request: AsyncRequest, task_id: int):
         user = request.user
         if not user.is_authenticated:
@@ -1071,7 +1043,7 @@ class TaskAsyncViewSet(ViewSet):
                     created_at=comment.created_at,
                     user_id=comment.user.id,
                     user_name=comment.user.username
-                ).model_dump()
+                )
                 async for comment in comments
             ]
 
@@ -1083,6 +1055,7 @@ class TaskAsyncViewSet(ViewSet):
             return Response(data={'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @login_required
+    @replica_reads
     async def list_history(self, request: AsyncRequest, task_id: int):
         user = request.user
         if not user.is_authenticated:
@@ -1091,7 +1064,7 @@ class TaskAsyncViewSet(ViewSet):
         try:
             await Task.objects.aget(id=task_id, user_id=user.id)
             items = TaskHistory.objects.filter(task_id=task_id).select_related('user').order_by('-created_at')
-            history_list = [
+            history_list = await prefetched(
                 TaskHistoryRetrieveDTO(
                     id=item.id,
                     field=item.field,
@@ -1100,10 +1073,10 @@ class TaskAsyncViewSet(ViewSet):
                     created_at=item.created_at,
                     user_id=item.user.id if item.user else None,
                     user_name=item.user.username if item.user else None,
-                ).model_dump()
-                async for item in items
-            ]
-            return Response(data=history_list, status=status.HTTP_200_OK)
+                )
+                async for item in items.aiterator(chunk_size=STREAM_CHUNK_SIZE)
+            )
+            return StreamingJSONResponse(json_array(history_list))
         except Task.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
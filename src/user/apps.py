@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'user'
\ No newline at end of file
+    name = 'user'
+
+    def ready(self):
+        import user.signals
@@ -0,0 +1,78 @@
+import asyncio
+import statistics
+import time
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import SESSION_KEY
+from django.core.management.base import BaseCommand
+
+
+ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached": "infrastructure.comon.sessions",
+}
+
+
+def _summary(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    return f"mean {statistics.mean(timings) * 1000:.3f} ms, p95 {p95 * 1000:.3f} ms"
+
+
+class Command(BaseCommand):
+    help = "Compare session reads of the database and the cached (Redis + DB) session engines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=200)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for name, engine in ENGINES.items():
+            store_class = import_module(engine).SessionStore
+            keys = self._create_sessions(store_class, options["sessions"])
+            try:
+                sync_timings = self._read_sync(store_class, keys, options["rounds"])
+                async_timings = asyncio.run(self._read_async(store_class, keys, options["rounds"]))
+            finally:
+                for key in keys:
+                    store_class().delete(key)
+
+            self.stdout.write(f"{name:>6} sync:  {_summary(sync_timings)}")
+            self.stdout.write(f"{name:>6} async: {_summary(async_timings)}")
+
+    @staticmethod
+    def _create_sessions(store_class, count: int) -> list[str]:
+        keys = []
+        for i in range(count):
+            session = store_class()
+            session[SESSION_KEY] = str(i)
+            session["bench"] = "x" * 256
+            session.create()
+            keys.append(session.session_key)
+        return keys
+
+    @staticmethod
+    def _read_sync(store_class, keys: list[str], rounds: int) -> list[float]:
+        timings = []
+        for _ in range(rounds):
+            for key in keys:
+                started = time.perf_counter()
+                store_class(key).get(SESSION_KEY)
+                timings.append(time.perf_counter() - started)
+        return timings
+
+    @staticmethod
+    async def _read_async(store_class, keys: list[str], rounds: int) -> list[float]:
+        # What AsyncAuthentication pays: aget where the engine has it, a thread hop otherwise
+        timings = []
+        for _ in range(rounds):
+            for key in keys:
+                session = store_class(key)
+                started = time.perf_counter()
+                if hasattr(session, "aget"):
+                    await session.aget(SESSION_KEY)
+                else:
+                    await sync_to_async(session.get)(SESSION_KEY)
+                timings.append(time.perf_counter() - started)
+        return timings
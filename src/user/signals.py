@@ -0,0 +1,20 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User
+from infrastructure.comon.authetication import session_user_cache
+from infrastructure.comon.cache_versions import auth_version, bump_version, data_version
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Profile, password and is_active changes must not be served from the cache
+    bump_version(auth_version(instance.pk))
+    # Tasks embed the profile
+    bump_version(data_version(instance.pk))
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    # Other processes find the session gone on their next hit
+    session_user_cache.invalidate_session(request.session.session_key)
@@ -27,7 +27,7 @@ class UserSleepSettingsAsyncViewSet(ViewSet):
         payload = SleepSettingsRetrieveDTO(
             wake_up_time=wake.strftime("%H:%M") if wake else "08:00",
             bed_time=bed.strftime("%H:%M") if bed else "23:00",
-        ).model_dump()
+        )
 
         return Response(data=payload, status=status.HTTP_200_OK)
 
@@ -49,7 +49,7 @@ class UserSleepSettingsAsyncViewSet(ViewSet):
         payload = SleepSettingsRetrieveDTO(
             wake_up_time=dto.wake_up_time,
             bed_time=dto.bed_time,
-        ).model_dump()
+        )
 
         return Response(data=payload, status=status.HTTP_200_OK)
 
@@ -64,7 +64,7 @@ class UserThemeAsyncViewSet(ViewSet):
             return Response(status=status.HTTP_401_UNAUTHORIZED)
 
         theme = getattr(user, "theme", "dark")
-        payload = ThemeRetrieveDTO(theme=theme).model_dump()
+        payload = ThemeRetrieveDTO(theme=theme)
         return Response(data=payload, status=status.HTTP_200_OK)
 
     @login_required
@@ -81,5 +81,5 @@ class UserThemeAsyncViewSet(ViewSet):
         user.theme = dto.theme
         await user.asave(update_fields=["theme"])
 
-        payload = ThemeRetrieveDTO(theme=dto.theme).model_dump()
+        payload = ThemeRetrieveDTO(theme=dto.theme)
         return Response(data=payload, status=status.HTTP_200_OK)